@@ -112,7 +112,7 @@ def verify_otp_endpoint(request):
             
             # Generate JWT
             from apps.verification.auth_middleware import generate_jwt
-            token = generate_jwt(user['user_id'], phone)
+            token = generate_jwt(user['user_id'], phone, user.get('verification_status'))
             user['token'] = token
             
             return Response(user, status=status.HTTP_200_OK)
@@ -184,7 +184,7 @@ def signup(request):
         
         # Generate JWT token
         from apps.verification.auth_middleware import generate_jwt
-        token = generate_jwt(user['user_id'], phone)
+        token = generate_jwt(user['user_id'], phone, user.get('verification_status'))
         user['token'] = token
         
         return Response(user, status=status.HTTP_201_CREATED)
@@ -249,7 +249,7 @@ def login(request):
         
         # Generate JWT token
         from apps.verification.auth_middleware import generate_jwt
-        token = generate_jwt(user['user_id'], phone)
+        token = generate_jwt(user['user_id'], phone, user.get('verification_status'))
         user['token'] = token
         
         return Response(user, status=status.HTTP_200_OK)
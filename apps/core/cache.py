@@ -0,0 +1,76 @@
+"""
+In-process LRU cache with optional TTL and hit/miss/eviction counters.
+One instance per worker process; thread-safe.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Size-bounded LRU mapping. Entries older than `ttl` seconds read as misses."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize   = maxsize
+        self.ttl       = ttl
+        self._data     = OrderedDict()   # key → (stored_at, value)
+        self._lock     = threading.Lock()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._data[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key) -> bool:
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def delete_where(self, predicate) -> int:
+        """Drop every entry whose key satisfies predicate(key). Returns how many were dropped."""
+        with self._lock:
+            doomed = [k for k in self._data if predicate(k)]
+            for k in doomed:
+                del self._data[k]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size':      len(self._data),
+            'maxsize':   self.maxsize,
+            'ttl':       self.ttl,
+            'hits':      self.hits,
+            'misses':    self.misses,
+            'evictions': self.evictions,
+            'hit_rate':  round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,15 @@
+"""
+Datetime helpers for the Mongo pollers (ride index, status feed, receipts).
+"""
+from datetime import datetime, timedelta, timezone
+
+# A poller asks for documents stamped after its last watermark. Writes
+# committed slightly out of order can carry a stamp just below it, so each
+# poll re-reads this much before the watermark; applying a document twice
+# is harmless.
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+def aware_utc(dt: datetime) -> datetime:
+    """`dt` as an aware UTC datetime (pymongo hands back naive UTC datetimes)."""
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
@@ -10,6 +10,7 @@ from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 
 from database.mongo import get_reviews_collection, get_rides_collection, get_users_collection
+from apps.rides.services import RideService
 from apps.verification.auth_middleware import verified_required
 
 
@@ -19,7 +20,8 @@ from apps.verification.auth_middleware import verified_required
 def _recalculate_rating(reviewee_oid: ObjectId):
     """
     Aggregates all reviews for reviewee_oid, computes the average rating,
-    and writes it back to the users collection.
+    and writes it back to the users collection. Rides the reviewee
+    created are touched so ride search stops serving the old rating.
     """
     reviews  = get_reviews_collection()
     users    = get_users_collection()
@@ -31,7 +33,9 @@ def _recalculate_rating(reviewee_oid: ObjectId):
     result = list(reviews.aggregate(pipeline))
     if result:
         avg = round(result[0]['avg_rating'], 2)
-        users.update_one({'_id': reviewee_oid}, {'$set': {'rating': avg}})
+        changed = users.update_one({'_id': reviewee_oid}, {'$set': {'rating': avg}})
+        if changed.modified_count:
+            RideService.creator_profile_changed(reviewee_oid)
 
 
 # ─────────────────────────────────────────────────────────
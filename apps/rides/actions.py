@@ -0,0 +1,320 @@
+"""
+Ride actions — join request, approve/reject, completion vote
+Shared by the HTTP views and the ride WebSocket channel. Each action is
+one conditional update plus its side effects (cache/index invalidation,
+ride event, push notification) and returns (response body, HTTP status);
+callers handle authentication and input parsing.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from rest_framework import status
+
+from database.mongo import get_users_collection, get_rides_collection
+from apps.users.notifications import send_push_notification, send_bulk_notifications
+from .events import publish_ride_event
+from .hydration import USER_DISPLAY_PROJECTION, display_fields
+from .services import RideService
+
+
+# Seats taken (creator included). Rides created before approved_count
+# existed count their APPROVED participants instead.
+_APPROVED_COUNT = {'$ifNull': ['$approved_count', {'$size': {'$filter': {
+    'input': {'$ifNull': ['$participants', []]},
+    'as':    'p',
+    'cond':  {'$eq': ['$$p.status', 'APPROVED']},
+}}}]}
+
+
+# ── Request to join ───────────────────────────────────────
+def _request_rejection(ride, user_oid) -> tuple[dict, int]:
+    """Error response for a join request whose conditional update matched nothing."""
+    if not ride:
+        return {'error': 'Ride not found.'}, status.HTTP_404_NOT_FOUND
+
+    # Must be ACTIVE
+    if ride.get('status') != 'ACTIVE':
+        return {'error': 'This ride is no longer active.'}, status.HTTP_400_BAD_REQUEST
+
+    # Cannot request own ride
+    if ride['creator_id'] == user_oid:
+        return {'error': 'You cannot request to join your own ride.'}, status.HTTP_400_BAD_REQUEST
+
+    # Already a participant (any status) — only the caller's entry is projected
+    already = next(iter(ride.get('participants') or []), None)
+    if already:
+        existing_status = already.get('status', '')
+        if existing_status == 'PENDING':
+            return {'error': 'Your request is already pending.'}, status.HTTP_409_CONFLICT
+        if existing_status == 'APPROVED':
+            return {'error': 'You are already in this ride.'}, status.HTTP_409_CONFLICT
+        if existing_status == 'REJECTED':
+            return {'error': 'Your request was rejected by the creator.'}, status.HTTP_409_CONFLICT
+
+    # Otherwise the seat guard failed
+    return {'error': 'This ride is full.'}, status.HTTP_400_BAD_REQUEST
+
+
+def request_join(ride_oid: ObjectId, user_oid: ObjectId) -> tuple[dict, int]:
+    """Add the user as a PENDING participant (see POST /rides/request for the rules)."""
+    rides = get_rides_collection()
+
+    # Requester's display copy is embedded in the participant entry
+    requester = get_users_collection().find_one({'_id': user_oid}, USER_DISPLAY_PROJECTION)
+
+    # Single conditional push: every rule is part of the filter, so
+    # concurrent requests can neither duplicate a participant nor
+    # join a ride whose seats are already taken.
+    ride = rides.find_one_and_update(
+        {
+            '_id':                  ride_oid,
+            'status':               'ACTIVE',
+            'creator_id':           {'$ne': user_oid},
+            'participants.user_id': {'$ne': user_oid},
+            # Rides created before seats_available existed have no flag
+            # yet; their seats are counted from the participants instead.
+            'seats_available':      {'$ne': False},
+            '$expr':                {'$lt': [_APPROVED_COUNT, '$max_seats']},
+        },
+        {
+            '$push': {'participants': {'user_id': user_oid, 'status': 'PENDING', **display_fields(requester)}},
+            '$set':  {'updated_at': datetime.utcnow()},
+        },
+        projection={'creator_id': 1, 'destination.name': 1, 'start_location': 1, 'ride_date': 1},
+    )
+
+    if not ride:
+        # Missed — work out which rule failed (off the success path)
+        return _request_rejection(rides.find_one(
+            {'_id': ride_oid},
+            {'status': 1, 'creator_id': 1, 'participants': {'$elemMatch': {'user_id': user_oid}}},
+        ), user_oid)
+
+    RideService.ride_changed(ride)
+    publish_ride_event(ride_oid, 'participant', user_id=str(user_oid), status='PENDING',
+                       **display_fields(requester))
+
+    print(f'[RIDE_REQUEST] User {user_oid} → ride {ride_oid}')
+
+    # Notify the ride creator
+    requester_name = (requester or {}).get('full_name') or (requester or {}).get('phone', 'Someone')
+    dest_name = ride.get('destination', {}).get('name', 'a ride')
+    send_push_notification(
+        ride['creator_id'],
+        'New Ride Request 🙋',
+        f'{requester_name} wants to join your ride to {dest_name}',
+        {'type': 'ride_request', 'ride_id': str(ride_oid)},
+        summary=f'{{count}} people want to join your ride to {dest_name}',
+    )
+
+    return {'message': 'Request sent'}, status.HTTP_200_OK
+
+
+# ── Creator responds ──────────────────────────────────────
+def _respond_rejection(ride, caller_oid) -> tuple[dict, int]:
+    """Error response for an approve/reject whose conditional update matched nothing."""
+    if not ride:
+        return {'error': 'Ride not found.'}, status.HTTP_404_NOT_FOUND
+
+    # Only creator
+    if ride['creator_id'] != caller_oid:
+        return {'error': 'Only the ride creator can respond to requests.'}, status.HTTP_403_FORBIDDEN
+
+    # Must be ACTIVE
+    if ride.get('status') != 'ACTIVE':
+        return {'error': 'Cannot respond after the ride is completed or cancelled.'}, status.HTTP_400_BAD_REQUEST
+
+    # Find target participant — only the target's entry is projected
+    target = next(iter(ride.get('participants') or []), None)
+    if not target:
+        return {'error': 'User has not requested to join this ride.'}, status.HTTP_404_NOT_FOUND
+
+    if target.get('status') != 'PENDING':
+        return {'error': f'Request is already {target["status"].lower()}.'}, status.HTTP_409_CONFLICT
+
+    # Otherwise the seat guard failed
+    return {'error': 'Ride is full. Cannot approve more riders.'}, status.HTTP_400_BAD_REQUEST
+
+
+def respond_request(ride_oid: ObjectId, caller_oid: ObjectId, target_oid: ObjectId, action: str) -> tuple[dict, int]:
+    """APPROVE or REJECT a PENDING participant (see POST /rides/respond for the rules)."""
+    rides = get_rides_collection()
+
+    # One conditional update: the filter enforces creator, ACTIVE, target
+    # still PENDING and — for approvals — seat capacity against the
+    # denormalized approved_count, which the same pipeline increments
+    # along with seats_available. Concurrent approvals cannot overfill
+    # the ride.
+    query = {
+        '_id':          ride_oid,
+        'creator_id':   caller_oid,
+        'status':       'ACTIVE',
+        'participants': {'$elemMatch': {'user_id': target_oid, 'status': 'PENDING'}},
+    }
+    if action == 'APPROVE':
+        query['$expr'] = {'$lt': [_APPROVED_COUNT, '$max_seats']}
+        is_target = {'$and': [{'$eq': ['$$p.user_id', target_oid]}, {'$eq': ['$$p.status', 'PENDING']}]}
+        update = [
+            {'$set': {
+                'participants': {'$map': {
+                    'input': '$participants',
+                    'as':    'p',
+                    'in':    {'$cond': [is_target, {'$mergeObjects': ['$$p', {'status': 'APPROVED'}]}, '$$p']},
+                }},
+                'approved_count': {'$add': [_APPROVED_COUNT, 1]},
+                'updated_at':     datetime.utcnow(),
+            }},
+            # Taking the last seat drops the ride from search
+            {'$set': {'seats_available': {'$lt': ['$approved_count', '$max_seats']}}},
+        ]
+    else:
+        update = {'$set': {'participants.$.status': 'REJECTED', 'updated_at': datetime.utcnow()}}
+
+    ride = rides.find_one_and_update(
+        query,
+        update,
+        projection={'approved_count': 1, 'max_seats': 1, 'destination.name': 1,
+                    'start_location': 1, 'ride_date': 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+    if not ride:
+        # Missed — work out which rule failed (off the success path)
+        return _respond_rejection(rides.find_one(
+            {'_id': ride_oid},
+            {'creator_id': 1, 'status': 1, 'participants': {'$elemMatch': {'user_id': target_oid}}},
+        ), caller_oid)
+
+    RideService.ride_changed(ride)
+    publish_ride_event(ride_oid, 'participant', user_id=str(target_oid),
+                       status='APPROVED' if action == 'APPROVE' else 'REJECTED',
+                       approved_count=ride.get('approved_count'))
+
+    msg = 'User approved' if action == 'APPROVE' else 'User rejected'
+    print(f'[RIDE_RESPOND] Creator {caller_oid} → {action} user {target_oid} on ride {ride_oid}')
+
+    # Notify the requesting user about outcome
+    dest_name = ride.get('destination', {}).get('name', 'the ride')
+    if action == 'APPROVE':
+        send_push_notification(
+            target_oid,
+            'Request Approved ✅',
+            f'Your request to join the ride to {dest_name} was approved!',
+            {'type': 'ride_approved', 'ride_id': str(ride_oid)},
+        )
+    else:
+        send_push_notification(
+            target_oid,
+            'Request Declined',
+            f'Your request to join the ride to {dest_name} was declined.',
+            {'type': 'ride_rejected', 'ride_id': str(ride_oid)},
+        )
+
+    return {'message': msg}, status.HTTP_200_OK
+
+
+# ── Completion vote ───────────────────────────────────────
+def _complete_rejection(ride, caller_oid) -> tuple[dict, int]:
+    """Error response for a completion vote whose conditional update matched nothing."""
+    if not ride:
+        return {'error': 'Ride not found.'}, status.HTTP_404_NOT_FOUND
+
+    if ride.get('status') != 'ACTIVE':
+        return {'error': 'Ride is not active.'}, status.HTTP_400_BAD_REQUEST
+
+    return {'error': 'Only the creator or approved participants can complete a ride.'}, status.HTTP_403_FORBIDDEN
+
+
+def vote_complete(ride_oid: ObjectId, caller_oid: ObjectId) -> tuple[dict, int]:
+    """Record the caller's completion vote (see POST /rides/complete for the rules)."""
+    rides = get_rides_collection()
+    now   = datetime.utcnow()
+
+    # Vote and completion in one pipeline update. Only the caller whose
+    # vote flips the ride from ACTIVE to COMPLETED sees COMPLETED come
+    # back, so the side effects below can never run twice.
+    # Majority of the creator + APPROVED participants, counted from the
+    # participants array so rides without approved_count are covered too
+    eligible        = {'$setUnion': [['$creator_id'], {'$map': {
+        'input': {'$filter': {
+            'input': {'$ifNull': ['$participants', []]},
+            'as':    'p',
+            'cond':  {'$eq': ['$$p.status', 'APPROVED']},
+        }},
+        'as': 'p',
+        'in': '$$p.user_id',
+    }}]}
+    votes_cast      = {'$size': '$completion_votes'}
+    majority_needed = {'$add': [{'$floor': {'$divide': [{'$size': eligible}, 2]}}, 1]}
+    ride = rides.find_one_and_update(
+        {
+            '_id':    ride_oid,
+            'status': 'ACTIVE',
+            '$or': [
+                {'creator_id': caller_oid},
+                {'participants': {'$elemMatch': {'user_id': caller_oid, 'status': 'APPROVED'}}},
+            ],
+        },
+        [
+            {'$set': {
+                'completion_votes': {'$setUnion': [{'$ifNull': ['$completion_votes', []]}, [caller_oid]]},
+                'updated_at':       now,
+            }},
+            {'$set': {
+                'status':       {'$cond': [{'$gte': [votes_cast, majority_needed]}, 'COMPLETED', '$status']},
+                'completed_at': {'$cond': [{'$gte': [votes_cast, majority_needed]}, now, '$$REMOVE']},
+            }},
+        ],
+        projection={'creator_id': 1, 'participants': 1, 'completion_votes': 1,
+                    'status': 1, 'destination.name': 1, 'start_location': 1, 'ride_date': 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+    if not ride:
+        return _complete_rejection(rides.find_one(
+            {'_id': ride_oid},
+            {'status': 1, 'creator_id': 1, 'participants': {'$elemMatch': {'user_id': caller_oid}}},
+        ), caller_oid)
+
+    # Build eligible set: creator + APPROVED participants
+    approved_ids    = [p['user_id'] for p in ride.get('participants', []) if p.get('status') == 'APPROVED']
+    eligible        = list({ride['creator_id']} | set(approved_ids))   # deduplicated
+    current_votes   = ride.get('completion_votes', [])
+    majority_needed = (len(eligible) // 2) + 1
+
+    print(f'[COMPLETE] ride={ride_oid} votes={len(current_votes)}/{majority_needed}')
+    publish_ride_event(ride_oid, 'vote', votes=len(current_votes), needed=majority_needed)
+
+    if ride['status'] == 'COMPLETED':
+        RideService.ride_changed(ride)
+        publish_ride_event(ride_oid, 'status', status='COMPLETED')
+
+        # Increment total_buddy_matches for all eligible users
+        users = get_users_collection()
+        users.update_many(
+            {'_id': {'$in': eligible}},
+            {'$inc': {'total_buddy_matches': 1}},
+        )
+
+        print(f'[COMPLETE] Ride {ride_oid} COMPLETED — {len(eligible)} buddies matched')
+
+        # Notify all participants
+        dest_name = ride.get('destination', {}).get('name', 'your destination')
+        other_ids = [uid for uid in eligible if uid != caller_oid]
+        if other_ids:
+            send_bulk_notifications(
+                other_ids,
+                'Ride Completed 🎉',
+                f'Your ride to {dest_name} has been completed! Don\'t forget to leave a review.',
+                {'type': 'ride_completed', 'ride_id': str(ride_oid)},
+            )
+
+        return {'message': 'Ride completed', 'status': 'COMPLETED'}, status.HTTP_200_OK
+
+    # Vote recorded but not yet majority
+    return {
+        'message': 'Vote recorded',
+        'votes': len(current_votes),
+        'needed': majority_needed,
+    }, status.HTTP_200_OK
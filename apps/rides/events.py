@@ -0,0 +1,168 @@
+"""
+Ride events — pub/sub of ride deltas
+Ride actions publish a small delta whenever they change a ride; realtime
+endpoints (SSE stream, WebSocket channel) subscribe per ride. Subscribers
+live on an asyncio event loop, and publish() is thread-safe so sync code
+running in a worker thread can call it directly.
+
+The broker only tracks this process's subscribers. Getting an event from
+the publishing process to every process with subscribers is the job of
+the backend (settings.RIDE_EVENTS_BACKEND):
+  - InProcessBackend (default) delivers locally — one ASGI worker per node
+  - a multi-node backend (Redis pub/sub, Mongo change stream, ...)
+    subclasses EventBackend: publish() sends to the shared transport, and
+    whatever receives from it calls the `dispatch` callback from start()
+"""
+import asyncio
+import threading
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Deltas buffered per subscriber before it is considered too slow
+_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One subscriber's queue of events for a single ride."""
+
+    def __init__(self, broker: 'RideEventBroker', topic: str, loop: asyncio.AbstractEventLoop):
+        self.topic      = topic
+        self.queue      = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        self.loop       = loop
+        self.overflowed = False     # events were dropped; consumer must resync
+        self._broker    = broker
+
+    def _deliver(self, event: dict):
+        # Runs on self.loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> dict | None:
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        """Drop every queued event and clear `overflowed` (call before resyncing from a snapshot)."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class EventBackend:
+    """Transport between publishers and every process's broker."""
+
+    def start(self, dispatch):
+        """Begin delivering: call dispatch(topic, event) for each received event."""
+        raise NotImplementedError
+
+    def publish(self, topic: str, event: dict):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InProcessBackend(EventBackend):
+    """Publishes straight to this process's subscribers."""
+
+    def __init__(self):
+        self._dispatch = None
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+
+    def publish(self, topic: str, event: dict):
+        self._dispatch(topic, event)
+
+
+class RideEventBroker:
+    """Topic (ride id) → local subscriptions, fed by a pluggable backend."""
+
+    def __init__(self, backend: EventBackend | None = None):
+        self._subs      = {}      # ride id → set[Subscription]
+        self._lock      = threading.Lock()
+        self.published  = 0
+        self.delivered  = 0
+        self.backend    = None
+        self.set_backend(backend or InProcessBackend())
+
+    def set_backend(self, backend: EventBackend):
+        """Swap the transport (e.g. for a multi-node deployment or tests)."""
+        if self.backend is not None:
+            self.backend.close()
+        self.backend = backend
+        backend.start(self.dispatch)
+
+    def subscribe(self, ride_id: str) -> Subscription:
+        """Subscribe the running event loop to a ride's events."""
+        sub = Subscription(self, str(ride_id), asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(sub.topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.topic]
+
+    def publish(self, ride_id: str, event: dict):
+        """Publish an event for a ride through the backend."""
+        self.published += 1
+        self.backend.publish(str(ride_id), event)
+
+    def dispatch(self, topic: str, event: dict) -> int:
+        """Deliver an event to this process's subscribers. Returns subscribers reached."""
+        with self._lock:
+            subs = list(self._subs.get(topic, ()))
+
+        reached = 0
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, event)
+                reached += 1
+            except RuntimeError:
+                # Subscriber's loop is gone (server shutting down)
+                self.unsubscribe(sub)
+        self.delivered += reached
+        return reached
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'rides':         len(self._subs),
+                'subscriptions': sum(len(s) for s in self._subs.values()),
+                'published':     self.published,
+                'delivered':     self.delivered,
+                'backend':       type(self.backend).__name__,
+            }
+
+
+ride_events = RideEventBroker(import_string(settings.RIDE_EVENTS_BACKEND)())
+
+
+def ride_event(ride_id, event_type: str, **data) -> dict:
+    """A ride delta: {type, ride_id, at, **data}."""
+    return {
+        'type':    event_type,
+        'ride_id': str(ride_id),
+        'at':      datetime.now(timezone.utc).isoformat(),
+        **data,
+    }
+
+
+def publish_ride_event(ride_id, event_type: str, **data):
+    """Publish a ride delta to every subscriber of the ride."""
+    ride_events.publish(str(ride_id), ride_event(ride_id, event_type, **data))
@@ -0,0 +1,318 @@
+"""
+Rides Geometry — vectorised route matching
+NumPy-backed versions of the polyline / haversine helpers in services.py.
+Same maths, computed over whole coordinate arrays instead of point pairs.
+"""
+import math
+
+import numpy as np
+
+from .services import decode_polyline
+
+EARTH_RADIUS_M = 6_371_000
+
+# Douglas–Peucker tolerance for the stored simplified route. Well under the
+# 100 m overlap threshold, so the simplified line keeps the route's shape.
+SIMPLIFY_TOLERANCE_M = 15.0
+
+# Upper bound on (user point, ride point) pairs evaluated per batch, so even a
+# degenerate 5,000 × 5,000 comparison never allocates more than a few dozen MB.
+_MAX_BATCH_PAIRS = 1_000_000
+
+# Route cell grid for the multikey `route_cells` index (~220 m cells).
+ROUTE_CELL_DEG = 0.002
+_CELL_ROW = 1_000_000          # id = (lat_index + _CELL_ROW // 2) * _CELL_ROW + lng_index + _CELL_ROW // 2
+_M_PER_DEG = math.radians(1) * EARTH_RADIUS_M
+
+# Early-exit scoring re-checks the decision after every small batch.
+_EARLY_EXIT_BATCH_PAIRS = 4_096
+_MIN_BATCH_POINTS = 16
+
+
+# ── Polyline → float array ────────────────────────────────
+def decode_polyline_array(polyline_str: str) -> np.ndarray:
+    """
+    Decode an encoded polyline into an (n, 2) float64 array of (lat, lng).
+    Returns an empty (0, 2) array if the string is empty or invalid.
+    """
+    return as_coord_array(decode_polyline(polyline_str))
+
+
+def as_coord_array(coords) -> np.ndarray:
+    """Coerce a list of (lat, lng) pairs (or an existing array) to (n, 2) float64."""
+    arr = np.asarray(coords, dtype=np.float64)
+    if arr.size == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    return arr.reshape(-1, 2)
+
+
+# ── Precomputed ride geometry (stored on the ride document) ─
+def build_route_geometry(polyline_str: str) -> dict:
+    """
+    Decode a ride polyline once and derive everything search needs from it.
+
+    Returns:
+        {
+            'coords':     [[lat, lng], ...],       # full decoded route
+            'bbox':       {min_lat, min_lng, max_lat, max_lng} | None,
+            'length_m':   float,                  # total route length
+            'simplified': [[lat, lng], ...],       # Douglas–Peucker copy
+        }
+    """
+    coords = decode_polyline_array(polyline_str)
+    if not len(coords):
+        return {'coords': [], 'bbox': None, 'length_m': 0.0, 'simplified': []}
+
+    return {
+        'coords':     coords.tolist(),
+        'bbox':       route_bbox(coords),
+        'length_m':   round(route_length_m(coords), 1),
+        'simplified': simplify_route(coords).tolist(),
+    }
+
+
+def route_bbox(coords) -> dict | None:
+    """Bounding box of a route as {min_lat, min_lng, max_lat, max_lng}."""
+    arr = as_coord_array(coords)
+    if not len(arr):
+        return None
+    mins, maxs = arr.min(axis=0), arr.max(axis=0)
+    return {
+        'min_lat': float(mins[0]), 'min_lng': float(mins[1]),
+        'max_lat': float(maxs[0]), 'max_lng': float(maxs[1]),
+    }
+
+
+def expand_bbox(bbox: dict, margin_m: float) -> dict:
+    """Grow a bbox by `margin_m` metres on every side."""
+    dlat = math.degrees(margin_m / EARTH_RADIUS_M)
+    widest_lat = math.radians(max(abs(bbox['min_lat']), abs(bbox['max_lat'])))
+    dlng = dlat / max(math.cos(widest_lat), 1e-6)
+    return {
+        'min_lat': bbox['min_lat'] - dlat, 'min_lng': bbox['min_lng'] - dlng,
+        'max_lat': bbox['max_lat'] + dlat, 'max_lng': bbox['max_lng'] + dlng,
+    }
+
+
+def bboxes_intersect(a: dict, b: dict) -> bool:
+    return (
+        a['min_lat'] <= b['max_lat'] and b['min_lat'] <= a['max_lat']
+        and a['min_lng'] <= b['max_lng'] and b['min_lng'] <= a['max_lng']
+    )
+
+
+# ── Route cells (grid index) ──────────────────────────────
+def _cell_indices(arr: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    lat_i = np.floor(arr[:, 0] / ROUTE_CELL_DEG).astype(np.int64)
+    lng_i = np.floor(arr[:, 1] / ROUTE_CELL_DEG).astype(np.int64)
+    return lat_i, lng_i
+
+
+def _cell_ids(lat_i: np.ndarray, lng_i: np.ndarray) -> np.ndarray:
+    half = _CELL_ROW // 2
+    return (lat_i + half) * _CELL_ROW + (lng_i + half)
+
+
+def route_cells(coords) -> list[int]:
+    """Sorted, de-duplicated grid cell ids of every point on a route."""
+    arr = as_coord_array(coords)
+    if not len(arr):
+        return []
+    return np.unique(_cell_ids(*_cell_indices(arr))).tolist()
+
+
+def user_cell_neighbourhoods(coords, threshold_m: float = 100.0) -> np.ndarray:
+    """
+    For each user point, the ids of every cell that could hold a ride point
+    within `threshold_m` of it: an (n, k) array. A ride whose route_cells
+    miss a point's whole row cannot match that point.
+    """
+    arr = as_coord_array(coords)
+    if not len(arr):
+        return np.empty((0, 0), dtype=np.int64)
+
+    widest_lat = math.radians(min(89.0, float(np.abs(arr[:, 0]).max()) + ROUTE_CELL_DEG))
+    lat_ring = math.ceil(threshold_m / (ROUTE_CELL_DEG * _M_PER_DEG))
+    lng_ring = math.ceil(threshold_m / (ROUTE_CELL_DEG * _M_PER_DEG * math.cos(widest_lat)))
+    dlat, dlng = np.meshgrid(
+        np.arange(-lat_ring, lat_ring + 1), np.arange(-lng_ring, lng_ring + 1), indexing='ij',
+    )
+
+    lat_i, lng_i = _cell_indices(arr)
+    return _cell_ids(lat_i[:, None] + dlat.ravel(), lng_i[:, None] + dlng.ravel())
+
+
+def cell_match_upper_bound(user_neighbourhoods: np.ndarray, ride_cells) -> int:
+    """
+    Upper bound on route_overlap matches: user points with at least one
+    ride cell in their neighbourhood.
+    """
+    if not len(user_neighbourhoods):
+        return 0
+    hit = np.isin(user_neighbourhoods, np.asarray(ride_cells, dtype=np.int64))
+    return int(np.count_nonzero(hit.any(axis=1)))
+
+
+def route_length_m(coords) -> float:
+    """Total haversine length of a route in metres."""
+    arr = as_coord_array(coords)
+    if len(arr) < 2:
+        return 0.0
+    rad = np.radians(arr)
+    a, b = rad[:-1], rad[1:]
+    h = (
+        np.sin((b[:, 0] - a[:, 0]) / 2) ** 2
+        + np.cos(a[:, 0]) * np.cos(b[:, 0]) * np.sin((b[:, 1] - a[:, 1]) / 2) ** 2
+    )
+    return float((2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(h))).sum())
+
+
+def simplify_route(coords, tolerance_m: float = SIMPLIFY_TOLERANCE_M) -> np.ndarray:
+    """
+    Douglas–Peucker simplification. Distances are measured on a local
+    equirectangular projection, which is accurate at city scale.
+    """
+    arr = as_coord_array(coords)
+    if len(arr) < 3:
+        return arr
+
+    lat0 = np.radians(arr[:, 0].mean())
+    xy = np.column_stack((
+        np.radians(arr[:, 1]) * np.cos(lat0) * EARTH_RADIUS_M,
+        np.radians(arr[:, 0]) * EARTH_RADIUS_M,
+    ))
+
+    keep  = np.zeros(len(arr), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(arr) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        seg = xy[j] - xy[i]
+        pts = xy[i + 1:j] - xy[i]
+        seg_len = np.hypot(*seg)
+        if seg_len == 0:
+            dists = np.hypot(pts[:, 0], pts[:, 1])
+        else:
+            dists = np.abs(seg[0] * pts[:, 1] - seg[1] * pts[:, 0]) / seg_len
+        k = int(np.argmax(dists))
+        if dists[k] > tolerance_m:
+            mid = i + 1 + k
+            keep[mid] = True
+            stack.append((i, mid))
+            stack.append((mid, j))
+    return arr[keep]
+
+
+def ride_route_coords(ride: dict) -> np.ndarray:
+    """
+    Decoded route for a ride document. Uses the precomputed geometry when
+    present and only falls back to decoding for rides not yet backfilled.
+    """
+    geometry = ride.get('route_geometry')
+    if geometry is not None:
+        return as_coord_array(geometry.get('coords', []))
+    return decode_polyline_array(ride.get('route_polyline', ''))
+
+
+# ── Route overlap (vectorised) ────────────────────────────
+def route_overlap_pct_np(user_coords, ride_coords, threshold_m: float = 100.0) -> float:
+    """
+    Drop-in replacement for services.route_overlap_pct.
+    % of user route points that are within `threshold_m` of any ride point.
+    Returns 100.0 if either route is empty (no polylines stored → skip filter).
+    """
+    user = as_coord_array(user_coords)
+    ride = as_coord_array(ride_coords)
+    if not len(user) or not len(ride):
+        return 100.0
+    matches = sum(hits for _, hits in _match_batches(user, ride, threshold_m))
+    return (matches / len(user)) * 100.0
+
+
+def route_overlap_decision(
+    user_coords,
+    ride_coords,
+    min_overlap_pct: float,
+    threshold_m: float = 100.0,
+    exact: bool = False,
+) -> tuple[bool, float | None]:
+    """
+    Whether route_overlap_pct(...) >= min_overlap_pct, deciding as early as possible.
+
+    User points are scored in small batches; scanning stops once enough
+    points matched to pass, or too few remain to ever reach the threshold.
+    Returns (passes, pct). pct is the exact percentage when the whole route
+    was scanned — always the case with exact=True — otherwise None.
+    """
+    user = as_coord_array(user_coords)
+    ride = as_coord_array(ride_coords)
+    if not len(user) or not len(ride):
+        return True, 100.0
+
+    n = len(user)
+    needed = _matches_needed(n, min_overlap_pct)
+    matches = 0
+    for scanned, hits in _match_batches(user, ride, threshold_m, max_pairs=_EARLY_EXIT_BATCH_PAIRS):
+        matches += hits
+        if exact:
+            continue
+        if matches >= needed:
+            return True, (matches / n) * 100.0 if scanned == n else None
+        if matches + (n - scanned) < needed:
+            return False, None
+    pct = (matches / n) * 100.0
+    return pct >= min_overlap_pct, pct
+
+
+def _matches_needed(n: int, min_overlap_pct: float) -> int:
+    """Smallest match count m with (m / n) * 100.0 >= min_overlap_pct (n + 1 if none)."""
+    m = max(0, math.ceil(min_overlap_pct * n / 100.0) - 1)
+    while m <= n and (m / n) * 100.0 < min_overlap_pct:
+        m += 1
+    return m
+
+
+def _match_batches(user: np.ndarray, ride: np.ndarray, threshold_m: float, max_pairs: int = _MAX_BATCH_PAIRS):
+    """
+    Score user points in route order, yielding (points_scanned, matches_in_batch)
+    per batch. A user point matches when some ride point is within
+    `threshold_m`. Great-circle distance is never less than R·|Δlat|, so only
+    ride points inside each user point's latitude band need the haversine.
+    """
+    user_rad = np.radians(user)
+    ride_rad = np.radians(ride)
+
+    order    = np.argsort(ride_rad[:, 0], kind='stable')
+    ride_rad = ride_rad[order]
+    band     = threshold_m / EARTH_RADIUS_M * (1 + 1e-9)
+
+    lo = np.searchsorted(ride_rad[:, 0], user_rad[:, 0] - band, side='left')
+    hi = np.searchsorted(ride_rad[:, 0], user_rad[:, 0] + band, side='right')
+    counts = hi - lo
+    cum    = np.cumsum(counts)
+
+    n, start = len(user_rad), 0
+    while start < n:
+        # Grow the batch until it holds ~max_pairs candidate pairs.
+        before = int(cum[start - 1]) if start else 0
+        end = int(np.searchsorted(cum, before + max_pairs, side='right'))
+        end = min(n, max(end, start + _MIN_BATCH_POINTS))
+        c   = counts[start:end]
+        total = int(c.sum())
+        hits  = 0
+        if total:
+            u_idx   = np.repeat(np.arange(start, end), c)
+            offsets = np.repeat(np.cumsum(c) - c, c)
+            r_idx   = np.repeat(lo[start:end], c) + (np.arange(total) - offsets)
+
+            a, b = user_rad[u_idx], ride_rad[r_idx]
+            h = (
+                np.sin((b[:, 0] - a[:, 0]) / 2) ** 2
+                + np.cos(a[:, 0]) * np.cos(b[:, 0]) * np.sin((b[:, 1] - a[:, 1]) / 2) ** 2
+            )
+            dists = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(h))
+            hits  = len(np.unique(u_idx[dists <= threshold_m]))
+        yield end, hits
+        start = end
@@ -0,0 +1,65 @@
+"""
+Ride hydration — participant and creator display info for ride screens
+Ride documents embed each participant's display name/phone (and the
+creator's as creator_name/creator_phone), so a fully denormalized ride
+needs no users query at all. IDs still missing a copy (rides written
+before denormalization) are resolved with one projected `$in` query
+instead of a find_one per person.
+"""
+from database.mongo import get_users_collection
+
+USER_DISPLAY_PROJECTION = {'full_name': 1, 'phone': 1}
+
+
+def display_name(user: dict | None) -> str:
+    return (user or {}).get('full_name') or (user or {}).get('phone', 'Unknown')
+
+
+def display_fields(user: dict | None) -> dict:
+    """The {name, phone} copy embedded in a ride's participant entry."""
+    return {'name': display_name(user), 'phone': (user or {}).get('phone', '')}
+
+
+def hydrate_ride(ride: dict) -> dict:
+    """
+    Resolve names/phones for a ride's participants and creator.
+
+    Returns:
+        {
+          'participants': [{user_id, name, phone, status}, ...],   # ride order
+          'creator':      {'name': ..., 'phone': ...},
+          'queries':      <Mongo queries issued by this call>,
+        }
+    """
+    participants = ride.get('participants', [])
+    missing = {p.get('user_id') for p in participants if 'name' not in p}
+    if 'creator_name' not in ride:
+        missing.add(ride.get('creator_id'))
+    missing.discard(None)
+
+    users, queries = {}, 0
+    if missing:
+        cursor = get_users_collection().find({'_id': {'$in': list(missing)}}, USER_DISPLAY_PROJECTION)
+        users = {u['_id']: display_fields(u) for u in cursor}
+        queries = 1
+
+    enriched = []
+    for p in participants:
+        uid  = p.get('user_id')
+        info = p if 'name' in p else users.get(uid) or display_fields(None)
+        enriched.append({
+            'user_id': str(uid),
+            'name':    info['name'],
+            'phone':   info.get('phone', ''),
+            'status':  p.get('status', ''),
+        })
+
+    if 'creator_name' in ride:
+        creator = {'name': ride['creator_name'], 'phone': ride.get('creator_phone', '')}
+    else:
+        creator = users.get(ride.get('creator_id')) or display_fields(None)
+    return {
+        'participants': enriched,
+        'creator':      creator,
+        'queries':      queries,
+    }
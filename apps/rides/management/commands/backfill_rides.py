@@ -0,0 +1,95 @@
+"""
+Backfill precomputed fields on existing ride documents.
+
+    python manage.py backfill_rides
+    python manage.py backfill_rides --batch-size 200 --dry-run
+
+Rides created before a field existed are updated in place so the search
+fast path covers the whole `rides` collection. Safe to re-run: only
+documents still missing a field are touched.
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from database.mongo import get_rides_collection, get_users_collection
+from apps.rides.geometry import build_route_geometry, ride_route_coords, route_cells
+
+
+def _geometry_update(ride: dict) -> dict:
+    return {'route_geometry': build_route_geometry(ride.get('route_polyline', ''))}
+
+
+def _route_cells_update(ride: dict) -> dict:
+    return {'route_cells': route_cells(ride_route_coords(ride))}
+
+
+def _seats_update(ride: dict) -> dict:
+    approved = sum(1 for p in ride.get('participants', []) if p.get('status') == 'APPROVED')
+    return {'approved_count': approved, 'seats_available': approved < ride.get('max_seats', 1)}
+
+
+_creator_genders = {}
+
+def _creator_gender_update(ride: dict) -> dict:
+    creator_id = ride['creator_id']
+    if creator_id not in _creator_genders:
+        user = get_users_collection().find_one({'_id': creator_id}, {'gender': 1})
+        _creator_genders[creator_id] = (user or {}).get('gender', 'Unknown')
+    return {'creator_gender': _creator_genders[creator_id]}
+
+
+# field → (filter for rides missing it, projection needed, builder)
+BACKFILL_STEPS = {
+    'route_geometry': (
+        {'route_geometry': {'$exists': False}},
+        {'route_polyline': 1},
+        _geometry_update,
+    ),
+    'route_cells': (
+        {'route_cells': {'$exists': False}},
+        {'route_geometry.coords': 1, 'route_polyline': 1},
+        _route_cells_update,
+    ),
+    'approved_count': (
+        {'approved_count': {'$exists': False}},
+        {'participants': 1, 'max_seats': 1},
+        _seats_update,
+    ),
+    'creator_gender': (
+        {'creator_gender': {'$exists': False}},
+        {'creator_id': 1},
+        _creator_gender_update,
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = 'Backfill precomputed ride fields (route geometry, route cells, seat counts, ...) on existing rides.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--only', nargs='+', choices=sorted(BACKFILL_STEPS),
+                            help='Run only these backfill steps.')
+        parser.add_argument('--dry-run', action='store_true', help='Count affected rides without writing.')
+
+    def handle(self, *args, **opts):
+        rides = get_rides_collection()
+        steps = opts['only'] or list(BACKFILL_STEPS)
+
+        for name in steps:
+            query, projection, build = BACKFILL_STEPS[name]
+            pending = rides.count_documents(query)
+            self.stdout.write(f'[{name}] {pending} ride(s) to backfill')
+            if opts['dry_run'] or not pending:
+                continue
+
+            updated, batch = 0, []
+            for ride in rides.find(query, projection):
+                batch.append(UpdateOne({'_id': ride['_id']}, {'$set': build(ride)}))
+                if len(batch) >= opts['batch_size']:
+                    updated += rides.bulk_write(batch, ordered=False).modified_count
+                    batch = []
+            if batch:
+                updated += rides.bulk_write(batch, ordered=False).modified_count
+
+            self.stdout.write(self.style.SUCCESS(f'[{name}] updated {updated} ride(s)'))
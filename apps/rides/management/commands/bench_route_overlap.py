@@ -0,0 +1,118 @@
+"""
+Benchmark: pure-Python route_overlap_pct vs the NumPy engine.
+
+    python manage.py bench_route_overlap
+    python manage.py bench_route_overlap --sizes 50 500 5000 --repeat 5
+    python manage.py bench_route_overlap --verify 2000
+
+Builds synthetic commute routes (random walks around a city centre) where
+the ride shares roughly the first half of the user's route, times both
+implementations and checks they agree. Also times early-exit scoring
+(route_overlap_decision) on a ride heading elsewhere — the common
+rejection case — and with --verify checks its accept/reject decisions
+against the full scan on random route pairs.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.rides.services import route_overlap_pct
+from apps.rides.geometry import route_overlap_decision, route_overlap_pct_np
+
+
+def _synthetic_route(n: int, rng: random.Random, start=(23.0225, 72.5714), step_deg=0.0004):
+    """Random-walk route of n points, ~40 m between consecutive points."""
+    lat, lng = start
+    coords = []
+    for _ in range(n):
+        lat += rng.uniform(-step_deg, step_deg * 2)
+        lng += rng.uniform(-step_deg, step_deg * 2)
+        coords.append((round(lat, 5), round(lng, 5)))
+    return coords
+
+
+def _synthetic_pair(n: int, rng: random.Random):
+    """User route + ride route sharing the first half, diverging afterwards."""
+    user   = _synthetic_route(n, rng)
+    shared = user[: max(1, n // 2)]
+    tail   = _synthetic_route(n - len(shared), rng, start=(shared[-1][0] - 0.02, shared[-1][1] + 0.02))
+    return user, shared + tail
+
+
+def _time(fn, repeat: int) -> tuple[float, float]:
+    """Best-of-`repeat` wall time in seconds, plus the last result."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Benchmark route overlap scoring: pure Python vs NumPy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[50, 200, 1000, 2000, 5000],
+                            help='Route lengths (points) to benchmark.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per size (best time is reported).')
+        parser.add_argument('--python-max', type=int, default=2000,
+                            help='Skip the pure-Python run above this size (it is O(n·m)).')
+        parser.add_argument('--min-overlap', type=float, default=50.0,
+                            help='Threshold used for the early-exit timings.')
+        parser.add_argument('--verify', type=int, default=0, metavar='N',
+                            help='Also check early-exit decisions against the full scan on N random pairs.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+        min_pct = opts['min_overlap']
+        self.stdout.write(
+            f'{"points":>8}  {"python (ms)":>12}  {"numpy (ms)":>11}  {"speedup":>8}  {"overlap %":>9}'
+            f'  {"reject full (ms)":>16}  {"reject early (ms)":>17}'
+        )
+
+        for n in opts['sizes']:
+            user, ride = _synthetic_pair(n, rng)
+
+            np_time, np_pct = _time(lambda: route_overlap_pct_np(user, ride), opts['repeat'])
+
+            if n <= opts['python_max']:
+                py_time, py_pct = _time(lambda: route_overlap_pct(user, ride), max(1, opts['repeat'] // 2))
+                if abs(py_pct - np_pct) > 1e-9:
+                    self.stderr.write(f'  MISMATCH at n={n}: python={py_pct:.4f} numpy={np_pct:.4f}')
+                py_col, speedup = f'{py_time * 1000:12.1f}', f'{py_time / np_time:7.1f}x'
+            else:
+                py_col, speedup = f'{"skipped":>12}', f'{"-":>8}'
+
+            # Rejection case: a ride that starts nearby but heads elsewhere
+            away = _synthetic_route(n, rng, start=(user[0][0] + 0.0005, user[0][1] - 0.03))
+            full_time, _  = _time(lambda: route_overlap_pct_np(user, away), opts['repeat'])
+            early_time, _ = _time(lambda: route_overlap_decision(user, away, min_pct), opts['repeat'])
+
+            self.stdout.write(
+                f'{n:>8}  {py_col}  {np_time * 1000:11.2f}  {speedup}  {np_pct:9.1f}'
+                f'  {full_time * 1000:16.2f}  {early_time * 1000:17.2f}'
+            )
+
+        if opts['verify']:
+            self._verify_decisions(rng, opts['verify'])
+
+    def _verify_decisions(self, rng: random.Random, cases: int):
+        """Early-exit decisions must match route_overlap_pct on every case and threshold."""
+        mismatches = 0
+        for i in range(cases):
+            n = rng.randint(1, 300)
+            if i % 2:
+                user, ride = _synthetic_pair(n, rng)
+            else:
+                user, ride = _synthetic_route(n, rng), _synthetic_route(rng.randint(1, 300), rng)
+            pct = route_overlap_pct(user, ride)
+            for threshold in (0.0, 25.0, 33.3, 50.0, 75.0, 100.0):
+                passes, early_pct = route_overlap_decision(user, ride, threshold)
+                if passes != (pct >= threshold) or (early_pct is not None and early_pct != pct):
+                    mismatches += 1
+                    self.stderr.write(f'  MISMATCH n={n} threshold={threshold}: full={pct:.4f} early={passes}')
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f'verify: {cases} route pairs × 6 thresholds, {mismatches} mismatch(es)'))
@@ -0,0 +1,205 @@
+"""
+Load harness: many concurrent WebSocket ride channels, driven in-process.
+
+    python manage.py ride_channel_harness                    # 200 rides x 3 riders
+    python manage.py ride_channel_harness --rides 500 --riders 2
+    python manage.py ride_channel_harness --keep             # leave the data behind
+
+It writes to the configured MongoDB (MONGODB_URI / MONGODB_DB_NAME) and
+asks for confirmation unless --noinput is given; point it at a scratch
+database, e.g. MONGODB_DB_NAME=alingo_harness.
+
+Creates synthetic VERIFIED users and rides (tagged `harness: True`), then
+opens one channel per creator and rider against apps.rides.ws.ride_channel
+with in-memory ASGI queues — no server or network involved. Each rider
+sends "request", the creator approves everyone, then a majority of
+members vote "complete". Reports action round-trip and event delivery
+latencies plus broker stats, and deletes the synthetic data — users,
+rides and the notification outbox entries queued for those rides —
+unless --keep is given.
+
+Users have no expo_push_token, so no pushes are sent.
+"""
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.rides.events import ride_events
+from apps.rides.services import RideService
+from apps.rides.ws import ride_channel
+from apps.verification.auth_middleware import generate_jwt
+from database.mongo import get_notification_outbox_collection, get_rides_collection, get_users_collection
+
+
+class _Client:
+    """One fake WebSocket connection: ASGI queues plus a reader task."""
+
+    def __init__(self, ride_id: str, user_id: str):
+        self.inbox   = asyncio.Queue()       # client → server
+        self.results = {}                    # ref → future
+        self.events  = []                    # (type, latency ms)
+        self.closed  = asyncio.Event()
+        self.scope   = {
+            'type':         'websocket',
+            'path':         f'/ws/rides/{ride_id}',
+            'query_string': b'',
+            'headers':      [(b'authorization', f'Bearer {generate_jwt(user_id, "harness", "VERIFIED")}'.encode())],
+        }
+        self._refs = 0
+
+    async def _receive(self):
+        return await self.inbox.get()
+
+    async def _send(self, message: dict):
+        if message['type'] == 'websocket.close':
+            self.closed.set()
+            return
+        if message['type'] != 'websocket.send':
+            return
+        data = json.loads(message['text'])
+        if data['type'] == 'result':
+            self.results.pop(data['ref']).set_result(data)
+        elif 'at' in data:
+            sent = datetime.fromisoformat(data['at'])
+            self.events.append((data['type'], (datetime.now(timezone.utc) - sent).total_seconds() * 1000))
+
+    def open(self):
+        self.inbox.put_nowait({'type': 'websocket.connect'})
+        self.task = asyncio.ensure_future(ride_channel(self.scope, self._receive, self._send))
+
+    async def act(self, **message) -> tuple[dict, float]:
+        self._refs += 1
+        ref    = self._refs
+        future = self.results[ref] = asyncio.get_running_loop().create_future()
+        t0     = time.perf_counter()
+        self.inbox.put_nowait({'type': 'websocket.receive', 'text': json.dumps({**message, 'ref': ref})})
+        result = await future
+        return result, (time.perf_counter() - t0) * 1000
+
+    async def shutdown(self):
+        self.inbox.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await self.task
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Command(BaseCommand):
+    help = 'Simulate concurrent WebSocket ride channels in-process and report latencies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rides', type=int, default=200, help='Concurrent rides (one channel per member).')
+        parser.add_argument('--riders', type=int, default=3, help='Riders joining each ride.')
+        parser.add_argument('--keep', action='store_true', help='Do not delete the synthetic users/rides.')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask before writing to the configured database.')
+
+    def handle(self, *args, **opts):
+        n_rides, n_riders = opts['rides'], opts['riders']
+        if opts['interactive']:
+            answer = input(f'This writes synthetic users and rides to MongoDB database '
+                           f'"{settings.MONGODB_DB_NAME}" at {settings.MONGODB_URI}. Type "yes" to continue: ')
+            if answer != 'yes':
+                raise CommandError('Aborted.')
+
+        users  = get_users_collection()
+        rides  = get_rides_collection()
+        outbox = get_notification_outbox_collection()
+
+        # uid and phone are unique per user; the run tag keeps them apart
+        # from real users and from data left behind by --keep runs
+        run = uuid.uuid4().hex[:8]
+        self.stdout.write(f'Seeding {n_rides} rides x {n_riders} riders (run {run})...')
+        user_ids = users.insert_many([
+            {'uid': f'harness-{run}-{i}', 'full_name': f'Harness {i}', 'phone': f'+000-{run}-{i:07d}',
+             'gender': 'Male', 'verification_status': 'VERIFIED', 'rating': 5.0, 'harness': True}
+            for i in range(n_rides * (n_riders + 1))
+        ]).inserted_ids
+
+        ride_plans = []
+        for r in range(n_rides):
+            members = [str(u) for u in user_ids[r * (n_riders + 1):(r + 1) * (n_riders + 1)]]
+            ride = RideService.create_ride(
+                members[0],
+                {'type': 'Point', 'coordinates': [72.5714, 23.0225]},
+                {'name': 'Harness', 'coordinates': [72.60, 23.05]},
+                '2030-01-01', '09:00', n_riders + 1, '',     # seats include the creator
+                creator_name=f'Harness {r}',
+            )
+            rides.update_one({'_id': ride['_id']}, {'$set': {'harness': True}})
+            ride_plans.append((str(ride['_id']), members))
+
+        try:
+            t0 = time.perf_counter()
+            latencies, events, failures = asyncio.run(self._run(ride_plans))
+            elapsed = time.perf_counter() - t0
+        finally:
+            if not opts['keep']:
+                outbox.delete_many({'data.ride_id': {'$in': [ride_id for ride_id, _ in ride_plans]}})
+                rides.delete_many({'harness': True})
+                users.delete_many({'harness': True})
+
+        channels = n_rides * (n_riders + 1)
+        self.stdout.write(f'{channels} channels, {sum(len(v) for v in latencies.values())} actions '
+                          f'in {elapsed:.2f}s ({failures} unexpected results)')
+        for action, values in latencies.items():
+            self.stdout.write(f'  {action:<9} round-trip  p50 {_pct(values, 0.5):7.1f} ms   '
+                              f'p95 {_pct(values, 0.95):7.1f} ms')
+        for event_type, values in events.items():
+            self.stdout.write(f'  {event_type:<11} event  p50 {_pct(values, 0.5):7.1f} ms   '
+                              f'p95 {_pct(values, 0.95):7.1f} ms   (n={len(values)})')
+        self.stdout.write(f'  broker: {ride_events.stats()}')
+
+        style = self.style.SUCCESS if not failures else self.style.WARNING
+        self.stdout.write(style('done'))
+
+    async def _run(self, ride_plans):
+        latencies = {'request': [], 'approve': [], 'complete': []}
+        failures  = 0
+
+        async def one_ride(ride_id, members):
+            nonlocal failures
+            clients = [_Client(ride_id, m) for m in members]
+            for c in clients:
+                c.open()
+            creator, riders = clients[0], clients[1:]
+
+            async def step(client, name, **message):
+                nonlocal failures
+                result, ms = await client.act(action=name, **message)
+                latencies[name].append(ms)
+                if result['status'] != 200:
+                    failures += 1
+
+            await asyncio.gather(*(step(c, 'request') for c in riders))
+            for m in members[1:]:
+                await step(creator, 'approve', user_id=m)
+            majority = len(clients) // 2 + 1
+            await asyncio.gather(*(step(c, 'complete') for c in clients[:majority]))
+
+            # The COMPLETED status event closes every member's socket
+            try:
+                await asyncio.wait_for(asyncio.gather(*(c.closed.wait() for c in clients)), 10)
+            except asyncio.TimeoutError:
+                failures += 1
+            for c in clients:
+                await c.shutdown()
+            return clients
+
+        done = await asyncio.gather(*(one_ride(*plan) for plan in ride_plans))
+
+        events = {}
+        for clients in done:
+            for c in clients:
+                for event_type, ms in c.events:
+                    events.setdefault(event_type, []).append(ms)
+        return latencies, events, failures
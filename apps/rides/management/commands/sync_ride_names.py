@@ -0,0 +1,35 @@
+"""
+Refresh the display names/phones embedded on ride documents.
+
+    python manage.py sync_ride_names                 # every user on any ride
+    python manage.py sync_ride_names --user <id> ... # just these users
+
+Ride documents carry copies of each participant's and the creator's
+display name so ride screens never join back to `users`. The API never
+changes a name or phone after sign-up, so run this after editing them
+outside it (admin, direct DB edits) or once to fill in rides created
+before the copies existed.
+"""
+from django.core.management.base import BaseCommand
+
+from database.mongo import get_rides_collection
+from apps.rides.services import RideService
+
+
+class Command(BaseCommand):
+    help = 'Fan out user display names/phones onto the ride documents that embed them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', nargs='+', dest='user_ids', metavar='USER_ID',
+                            help='Only sync these user ids.')
+
+    def handle(self, *args, **opts):
+        # The creator is always a participant, so this covers both roles
+        user_ids = opts['user_ids'] or get_rides_collection().distinct('participants.user_id')
+        self.stdout.write(f'{len(user_ids)} user(s) to sync')
+
+        modified = 0
+        for user_id in user_ids:
+            modified += RideService.sync_display_names(user_id)
+
+        self.stdout.write(self.style.SUCCESS(f'updated {modified} ride document(s)'))
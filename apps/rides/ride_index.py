@@ -0,0 +1,243 @@
+"""
+Warm in-process index of ACTIVE rides — one per worker
+Rides are bucketed by ride_date, and each bucket has a KD-tree over ride
+start points, so search can find nearby rides without a Mongo query.
+
+The index stays current by polling rides whose `updated_at` moved past
+the last watermark (every ride mutation sets it). Only changed rides are
+re-read into the bucket's small unindexed delta; the tree is rebuilt
+only once enough of a bucket changed. The first refresh loads every
+ACTIVE ride once, in the background — search uses its other paths until
+the index is ready. Off by default (RIDE_SEARCH_INDEX_ENABLED).
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+
+from apps.core.timeutil import WATERMARK_OVERLAP
+from database.mongo import get_rides_collection
+from .geometry import EARTH_RADIUS_M
+from .services import search_enrichment_stages
+
+_LEAF_SIZE = 32
+
+# A bucket's tree is rebuilt once its unindexed delta (added, replaced or
+# removed rides) exceeds max(_REBUILD_MIN, rides / _REBUILD_FRACTION).
+_REBUILD_MIN      = 256
+_REBUILD_FRACTION = 8
+
+
+def _unit_vectors(lng_lat: np.ndarray) -> np.ndarray:
+    """[lng, lat] degrees → points on the unit sphere (chord distance ↔ great-circle)."""
+    lng, lat = np.radians(lng_lat[:, 0]), np.radians(lng_lat[:, 1])
+    return np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)))
+
+
+def _chord(radius_m: float) -> float:
+    return 2 * np.sin(min(radius_m / EARTH_RADIUS_M, np.pi) / 2)
+
+
+class _KDTree:
+    """Static 3-d KD-tree with numpy-scanned leaves; radius queries only."""
+
+    def __init__(self, points: np.ndarray):
+        self.points = points
+        self.root = self._build(np.arange(len(points)), depth=0) if len(points) else None
+
+    def _build(self, idx: np.ndarray, depth: int):
+        if len(idx) <= _LEAF_SIZE:
+            return ('leaf', idx)
+        axis  = depth % 3
+        order = idx[np.argsort(self.points[idx, axis], kind='stable')]
+        mid   = len(order) // 2
+        split = self.points[order[mid], axis]
+        return ('node', axis, split,
+                self._build(order[:mid], depth + 1),
+                self._build(order[mid:], depth + 1))
+
+    def query_radius(self, point: np.ndarray, chord: float) -> np.ndarray:
+        found, stack = [], [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if node[0] == 'leaf':
+                idx = node[1]
+                d2 = ((self.points[idx] - point) ** 2).sum(axis=1)
+                found.append(idx[d2 <= chord * chord])
+                continue
+            _, axis, split, left, right = node
+            diff = point[axis] - split
+            if diff - chord <= 0:
+                stack.append(left)
+            if diff + chord >= 0:
+                stack.append(right)
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+class _DateBucket:
+    """
+    Rides for one date: a KD-tree over a snapshot plus an unindexed delta.
+    Mutations only touch the delta (brute-forced on every query) and mark
+    replaced/removed snapshot rides dead; the tree is rebuilt when the
+    delta grows past _REBUILD_MIN or 1/_REBUILD_FRACTION of the bucket.
+    """
+
+    def __init__(self):
+        self.rides = {}          # ride _id → search-shaped ride dict
+        self._tree = None
+        self._order = []         # tree point i → ride at snapshot time
+        self._indexed = set()    # ride _ids in the tree
+        self._dead = set()       # indexed _ids since replaced or removed
+        self._delta = {}         # ride _id → ride added/replaced since the snapshot
+        self._delta_points = None
+
+    def put(self, ride: dict):
+        ride_id = ride['_id']
+        self.rides[ride_id] = ride
+        if ride_id in self._indexed:
+            self._dead.add(ride_id)
+        self._delta[ride_id] = ride
+        self._delta_points = None
+
+    def remove(self, ride_id) -> bool:
+        if self.rides.pop(ride_id, None) is None:
+            return False
+        if ride_id in self._indexed:
+            self._dead.add(ride_id)
+        if self._delta.pop(ride_id, None) is not None:
+            self._delta_points = None
+        return True
+
+    def _rebuild(self):
+        self._order = list(self.rides.values())
+        coords = np.array([r['start_location']['coordinates'] for r in self._order], dtype=np.float64)
+        self._tree = _KDTree(_unit_vectors(coords))
+        self._indexed = set(self.rides)
+        self._dead.clear()
+        self._delta.clear()
+        self._delta_points = None
+
+    def nearby(self, location: list, radius_m: float) -> list[dict]:
+        if not self.rides:
+            return []
+        pending = len(self._delta) + len(self._dead)
+        if self._tree is None or pending > max(_REBUILD_MIN, len(self.rides) // _REBUILD_FRACTION):
+            self._rebuild()
+        point = _unit_vectors(np.array([location], dtype=np.float64))[0]
+        chord = _chord(radius_m)
+
+        found = [self._order[i] for i in self._tree.query_radius(point, chord)]
+        if self._dead:
+            found = [r for r in found if r['_id'] not in self._dead]
+        if self._delta:
+            delta = list(self._delta.values())
+            if self._delta_points is None:
+                coords = np.array([r['start_location']['coordinates'] for r in delta], dtype=np.float64)
+                self._delta_points = _unit_vectors(coords)
+            d2 = ((self._delta_points - point) ** 2).sum(axis=1)
+            found.extend(delta[i] for i in np.flatnonzero(d2 <= chord * chord))
+        return found
+
+
+class ActiveRideIndex:
+    """Per-worker ACTIVE-ride index, bucketed by ride_date."""
+
+    def __init__(self, enabled: bool, poll_interval: float):
+        self.enabled       = enabled
+        self.poll_interval = poll_interval
+        self._buckets      = {}       # ride_date → _DateBucket
+        self._where        = {}       # ride _id → ride_date, to move/remove rides
+        self._watermark    = None
+        self._last_poll    = 0.0
+        self._lock         = threading.Lock()
+        self._warming      = None     # background warm-up thread
+
+    @property
+    def ready(self) -> bool:
+        """True once the warm-up load finished; until then search uses its other paths."""
+        return self.enabled and self._watermark is not None
+
+    def mark_stale(self):
+        """Force the next refresh to poll (called after local ride mutations)."""
+        self._last_poll = 0.0
+
+    def _warm_up(self):
+        try:
+            with self._lock:
+                self._poll({'status': 'ACTIVE'})
+        except Exception as e:
+            # Searches keep using the other paths; the next refresh retries
+            print(f'[RIDE_INDEX ERROR] warm-up failed: {e}')
+        finally:
+            self._warming = None
+
+    def _poll(self, match: dict):
+        polled_at = datetime.now(timezone.utc)
+        pipeline  = [{'$match': match}] + search_enrichment_stages()
+        for ride in get_rides_collection().aggregate(pipeline):
+            self._apply(ride)
+        self._drop_past_dates(polled_at.date().isoformat())
+        self._watermark = polled_at
+        self._last_poll = time.monotonic()
+
+    def refresh(self) -> int:
+        """
+        Apply ride changes since the last poll, at most once per
+        poll_interval. Returns the number of Mongo queries issued (0 or 1).
+        The first call only starts loading every ACTIVE ride in a
+        background thread, so no request waits for the warm-up.
+        """
+        if not self.enabled:
+            return 0
+        if self._watermark is None:
+            with self._lock:
+                if self._watermark is None and self._warming is None:
+                    self._warming = threading.Thread(target=self._warm_up, name='ride-index-warm-up', daemon=True)
+                    self._warming.start()
+            return 0
+        if time.monotonic() - self._last_poll < self.poll_interval:
+            return 0
+        with self._lock:
+            if time.monotonic() - self._last_poll < self.poll_interval:
+                return 0
+            self._poll({'updated_at': {'$gt': self._watermark - WATERMARK_OVERLAP}})
+            return 1
+
+    def _apply(self, ride: dict):
+        ride_id = ride['_id']
+        old_date = self._where.pop(ride_id, None)
+        if old_date is not None:
+            self._buckets[old_date].remove(ride_id)
+        if ride.get('status') == 'ACTIVE' and ride.get('seats_available', True):
+            self._buckets.setdefault(ride['ride_date'], _DateBucket()).put(ride)
+            self._where[ride_id] = ride['ride_date']
+
+    def _drop_past_dates(self, today: str):
+        for ride_date in [d for d in self._buckets if d < today]:
+            for ride_id in self._buckets.pop(ride_date).rides:
+                self._where.pop(ride_id, None)
+
+    def nearby(self, ride_date: str, location: list, radius_m: float) -> list[dict]:
+        """ACTIVE rides with free seats on ride_date starting within radius_m of location [lng, lat]."""
+        bucket = self._buckets.get(ride_date)
+        if bucket is None:
+            return []
+        with self._lock:
+            return bucket.nearby(location, radius_m)
+
+    def stats(self) -> dict:
+        return {
+            'enabled':   self.enabled,
+            'ready':     self.ready,
+            'rides':     len(self._where),
+            'dates':     len(self._buckets),
+            'watermark': self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+ride_index = ActiveRideIndex(
+    enabled=settings.RIDE_SEARCH_INDEX_ENABLED,
+    poll_interval=settings.RIDE_SEARCH_INDEX_POLL_SECONDS,
+)
@@ -0,0 +1,84 @@
+"""
+Ride search cache — candidate sets per (geo cell, ride_date)
+Searches from the same neighbourhood on the same date share one Mongo
+query. Entries only hold user-independent filtering (ACTIVE, date, free
+seats); each caller's own exclusions are applied after the lookup.
+"""
+import math
+
+from django.conf import settings
+
+from apps.core.cache import LRUCache
+from .services import SEARCH_RADIUS_M, haversine_m
+
+# Cells are CELL_DEG × CELL_DEG degrees (~1.1 km at the equator, narrower
+# in longitude further north). A cell's candidate set covers every ride
+# within the search radius of *any* point in the cell.
+CELL_DEG = 0.01
+CELL_HALF_DIAGONAL_M = 790
+CELL_RADIUS_M = SEARCH_RADIUS_M + CELL_HALF_DIAGONAL_M
+
+
+def cell_for(location: list) -> tuple[int, int]:
+    """Grid cell of a [lng, lat] point."""
+    lng, lat = location
+    return (math.floor(lat / CELL_DEG), math.floor(lng / CELL_DEG))
+
+
+def cell_center(cell: tuple[int, int]) -> list:
+    """Centre of a cell as [lng, lat]."""
+    lat_i, lng_i = cell
+    return [(lng_i + 0.5) * CELL_DEG, (lat_i + 0.5) * CELL_DEG]
+
+
+class SearchCache:
+    """LRU of candidate lists keyed by (cell, ride_date)."""
+
+    def __init__(self, maxsize: int, ttl: float | None):
+        self._lru = LRUCache(maxsize, ttl)
+
+    @property
+    def enabled(self) -> bool:
+        return self._lru.maxsize > 0
+
+    def get_candidates(self, location: list, ride_date: str, loader):
+        """
+        Cached candidate list for the cell containing `location`.
+        On a miss, loader(cell_center, radius_m) fetches and stores it.
+        Returns (candidates, hit).
+        """
+        key = (cell_for(location), ride_date)
+        candidates = self._lru.get(key)
+        if candidates is not None:
+            return candidates, True
+        candidates = loader(cell_center(key[0]), CELL_RADIUS_M)
+        self._lru.set(key, candidates)
+        return candidates, False
+
+    def invalidate_ride(self, ride: dict) -> int:
+        """Evict every cell whose candidate set could contain `ride`."""
+        coords = (ride.get('start_location') or {}).get('coordinates')
+        ride_date = ride.get('ride_date')
+        if not coords or not ride_date:
+            return 0
+
+        def covers(key):
+            cell, date = key
+            if date != ride_date:
+                return False
+            lng, lat = cell_center(cell)
+            return haversine_m(lat, lng, coords[1], coords[0]) <= CELL_RADIUS_M
+
+        return self._lru.delete_where(covers)
+
+    def clear(self):
+        self._lru.clear()
+
+    def stats(self) -> dict:
+        return self._lru.stats()
+
+
+search_cache = SearchCache(
+    maxsize=settings.RIDE_SEARCH_CACHE_SIZE,
+    ttl=settings.RIDE_SEARCH_CACHE_TTL,
+)
@@ -82,6 +82,192 @@ def route_overlap_pct(
     return (matches / len(user_coords)) * 100.0
 
 
+# ── Search aggregation pipeline ───────────────────────────
+SEARCH_RADIUS_M = 2000
+
+# Fields search needs from a ride (including those used for per-user
+# exclusions on cached candidates); keeps route_polyline only for rides
+# that have not been backfilled with route_geometry yet.
+_SEARCH_PROJECTION = {
+    'creator_id':            1,
+    'status':                1,
+    'seats_available':       1,
+    'start_location':        1,
+    'ride_date':             1,
+    'participants.user_id':  1,
+    'participants.status':   1,     # seat count of rides without approved_count
+    'gender_preference':     1,
+    'creator_gender':        1,
+    'creator':               1,
+    'creator_name':          1,
+    'distance_m':            1,
+    'max_seats':             1,
+    'approved_count':        1,
+    'ride_time':             1,
+    'destination.name':      1,
+    'route_geometry.coords': 1,
+    'route_geometry.bbox':   1,
+    'route_cells':           1,
+    'route_polyline':        1,
+}
+
+
+def seats_left(ride: dict) -> int:
+    """Free seats; rides not yet backfilled count their APPROVED participants."""
+    approved = ride.get('approved_count')
+    if approved is None:
+        approved = sum(1 for p in ride.get('participants', []) if p.get('status') == 'APPROVED')
+    return ride.get('max_seats', 1) - approved
+
+
+def _haversine_expr(user_location: list) -> dict:
+    """Aggregation expression: haversine metres from user_location [lng, lat] to start_location."""
+    lng, lat = user_location
+    ride_lat = {'$degreesToRadians': {'$arrayElemAt': ['$start_location.coordinates', 1]}}
+    ride_lng = {'$degreesToRadians': {'$arrayElemAt': ['$start_location.coordinates', 0]}}
+    half_dphi = {'$divide': [{'$subtract': [ride_lat, math.radians(lat)]}, 2]}
+    half_dlam = {'$divide': [{'$subtract': [ride_lng, math.radians(lng)]}, 2]}
+    a = {'$add': [
+        {'$pow': [{'$sin': half_dphi}, 2]},
+        {'$multiply': [
+            math.cos(math.radians(lat)),
+            {'$cos': ride_lat},
+            {'$pow': [{'$sin': half_dlam}, 2]},
+        ]},
+    ]}
+    return {'$multiply': [2 * 6_371_000, {'$asin': {'$sqrt': a}}]}
+
+
+def build_search_pipeline(
+    query: dict,
+    user_location: list,
+    use_geo: bool = True,
+    max_distance_m: float = SEARCH_RADIUS_M,
+) -> list[dict]:
+    """
+    Ride search as one aggregation: radius + filters → distance_m →
+    creator $lookup → ranked by distance ASC, creator rating DESC.
+
+    use_geo=True  → $geoNear (needs the start_location 2dsphere index).
+    use_geo=False → fallback for a missing index: same filters, distance
+                    computed with a haversine expression instead.
+    """
+    if use_geo:
+        stages = [{'$geoNear': {
+            'near':          {'type': 'Point', 'coordinates': user_location},  # [lng, lat]
+            'key':           'start_location',
+            'distanceField': 'distance_m',
+            'maxDistance':   max_distance_m,
+            'spherical':     True,
+            'query':         query,
+        }}]
+    else:
+        stages = [
+            {'$match': query},
+            {'$addFields': {'distance_m': _haversine_expr(user_location)}},
+            {'$match': {'distance_m': {'$lte': max_distance_m}}},
+        ]
+
+    return stages + search_enrichment_stages() + [
+        {'$sort': {'distance_m': 1, 'creator.rating': -1, '_id': 1}},
+    ]
+
+
+def search_enrichment_stages() -> list[dict]:
+    """Creator $lookup + projection shared by every ride-search pipeline."""
+    return [
+        {'$lookup': {
+            'from':     'users',
+            'let':      {'creator_id': '$creator_id'},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$_id', '$$creator_id']}}},
+                {'$project': {'full_name': 1, 'phone': 1, 'rating': 1, 'gender': 1}},
+            ],
+            'as': 'creator',
+        }},
+        {'$set': {'creator': {'$arrayElemAt': ['$creator', 0]}}},
+        {'$project': _SEARCH_PROJECTION},
+    ]
+
+
+def build_my_requests_pipeline(user_oid: ObjectId) -> list[dict]:
+    """
+    Rides (not created by user_oid) where the user has a participant entry,
+    with that entry picked out server-side ($filter). Creator names come
+    from the embedded creator_name copy. One round trip however many
+    requests exist.
+    """
+    return [
+        {'$match': {
+            'participants': {'$elemMatch': {
+                'user_id': user_oid,
+                'status':  {'$in': ['PENDING', 'APPROVED', 'REJECTED']},
+            }},
+            'status':     'ACTIVE',
+            'creator_id': {'$ne': user_oid},
+        }},
+        {'$project': {
+            'ride_time':        1,
+            'destination.name': 1,
+            'creator_id':       1,
+            'creator_name':     1,
+            'my_entry': {'$arrayElemAt': [
+                {'$filter': {
+                    'input': '$participants',
+                    'as':    'p',
+                    'cond':  {'$eq': ['$$p.user_id', user_oid]},
+                }},
+                0,
+            ]},
+        }},
+    ]
+
+
+def _fetch_candidates(rides, query: dict, location: list, max_distance_m: float) -> list[dict]:
+    """Run the search pipeline, falling back to the no-index variant if $geoNear fails."""
+    try:
+        return list(rides.aggregate(build_search_pipeline(query, location, max_distance_m=max_distance_m)))
+    except Exception as e:
+        print(f'[SEARCH GEO ERROR] {e}')
+        # Fallback: 2dsphere index missing → same pipeline without $geoNear
+        return list(rides.aggregate(
+            build_search_pipeline(query, location, use_geo=False, max_distance_m=max_distance_m)
+        ))
+
+
+def _exclude_for_user(
+    candidates: list[dict],
+    user_oid: ObjectId,
+    user_location: list,
+    searching_gender: str,
+    gender_filter: str,
+) -> list[dict]:
+    """
+    Per-user exclusions for a cached (cell-wide) candidate set — the same
+    predicates the uncached query applies server-side — plus the exact
+    distance from the caller. Returns new dicts; cached ones are not mutated.
+    """
+    kept = []
+    for ride in candidates:
+        if ride['creator_id'] == user_oid:
+            continue
+        if any(p.get('user_id') == user_oid for p in ride.get('participants', [])):
+            continue
+        if ride.get('gender_preference', 'Any') not in ('Any', searching_gender):
+            continue
+        if gender_filter != 'All' and ride.get('creator_gender') != gender_filter:
+            continue
+
+        ride_lng, ride_lat = ride['start_location']['coordinates']
+        dist_m = haversine_m(user_location[1], user_location[0], ride_lat, ride_lng)
+        if dist_m > SEARCH_RADIUS_M:
+            continue
+        kept.append({**ride, 'distance_m': dist_m})
+
+    kept.sort(key=lambda r: (r['distance_m'], -(r.get('creator') or {}).get('rating', 0.0), r['_id']))
+    return kept
+
+
 class RideService:
 
     # ── Block 5 ───────────────────────────────────────────
@@ -93,6 +279,80 @@ class RideService:
             'status':     'ACTIVE',
         })
 
+    @staticmethod
+    def ride_changed(ride: dict):
+        """
+        Hook for every ride mutation: evicts cached search cells around the
+        ride and makes this worker's ride index poll on its next search.
+        """
+        from .ride_index import ride_index
+        from .search_cache import search_cache
+
+        search_cache.invalidate_ride(ride)
+        ride_index.mark_stale()
+
+    @staticmethod
+    def creator_profile_changed(user_id) -> int:
+        """
+        Bump updated_at on the user's ACTIVE rides after a change to
+        creator data joined in at search time (e.g. rating), so cached
+        search candidates and the ride index pick it up. Returns the
+        number of rides touched.
+        """
+        touched = get_rides_collection().update_many(
+            {'creator_id': ObjectId(user_id), 'status': 'ACTIVE'},
+            {'$set': {'updated_at': datetime.now(timezone.utc)}},
+        )
+        if touched.modified_count:
+            from .search_cache import search_cache
+            from .ride_index import ride_index
+            search_cache.clear()
+            ride_index.mark_stale()
+        return touched.modified_count
+
+    @staticmethod
+    def sync_display_names(user_id) -> int:
+        """
+        Rewrite the display name/phone copies embedded for `user_id` on
+        every ride (as creator and as participant). Returns the number of
+        documents modified, summed over both passes.
+        """
+        from database.mongo import get_users_collection
+        from .hydration import USER_DISPLAY_PROJECTION, display_fields
+
+        user_oid = ObjectId(user_id)
+        user = get_users_collection().find_one({'_id': user_oid}, USER_DISPLAY_PROJECTION)
+        if not user:
+            return 0
+        fields = display_fields(user)
+        rides  = get_rides_collection()
+
+        # Creator copy — bump updated_at (only where it actually changed)
+        # so the search index re-reads those rides
+        created = rides.update_many(
+            {
+                'creator_id': user_oid,
+                '$or': [{'creator_name': {'$ne': fields['name']}}, {'creator_phone': {'$ne': fields['phone']}}],
+            },
+            {'$set': {
+                'creator_name':  fields['name'],
+                'creator_phone': fields['phone'],
+                'updated_at':    datetime.now(timezone.utc),
+            }},
+        )
+        joined = rides.update_many(
+            {'participants.user_id': user_oid},
+            {'$set': {'participants.$[p].name': fields['name'], 'participants.$[p].phone': fields['phone']}},
+            array_filters=[{'p.user_id': user_oid}],
+        )
+        if created.modified_count:
+            # Cached search candidates carry the old creator name
+            from .search_cache import search_cache
+            from .ride_index import ride_index
+            search_cache.clear()
+            ride_index.mark_stale()
+        return created.modified_count + joined.modified_count
+
     @staticmethod
     def create_ride(
         creator_id: str,
@@ -103,26 +363,50 @@ class RideService:
         max_seats: int,
         route_polyline: str,
         gender_preference: str = 'Any',
+        creator_gender: str = 'Unknown',
+        creator_name: str = 'Unknown',
+        creator_phone: str = '',
     ) -> dict:
-        rides = get_rides_collection()
+        from .geometry import build_route_geometry, route_cells
+
+        rides    = get_rides_collection()
+        geometry = build_route_geometry(route_polyline)
+        now      = datetime.now(timezone.utc)
         ride_doc = {
             'creator_id':        ObjectId(creator_id),
             'start_location':    start_location,
             'destination':       destination,
             'route_polyline':    route_polyline,
+            'route_geometry':    geometry,
+            # Grid cells the route passes through (multikey-indexed) for
+            # indexed route-overlap lookups in search.
+            'route_cells':       route_cells(geometry['coords']),
             'gender_preference': gender_preference,
+            'creator_gender':    creator_gender,
+            # Display copies so ride screens skip the users join; refreshed
+            # by the sync_ride_names command after out-of-band profile edits.
+            'creator_name':      creator_name,
+            'creator_phone':     creator_phone,
             'ride_date':         ride_date,
             'ride_time':         ride_time,
             'max_seats':         max_seats,
             'participants': [{
                 'user_id': ObjectId(creator_id),
                 'status':  'APPROVED',
+                'name':    creator_name,
+                'phone':   creator_phone,
             }],
+            # Denormalized seat state (creator counts as approved) so search
+            # can drop full rides server-side. Kept in sync by actions.respond_request.
+            'approved_count':  1,
+            'seats_available': max_seats > 1,
             'status':     'ACTIVE',
-            'created_at': datetime.now(timezone.utc),
+            'created_at': now,
+            'updated_at': now,   # bumped by every mutation; drives the ride index poll
         }
         result = rides.insert_one(ride_doc)
         ride_doc['_id'] = result.inserted_id
+        RideService.ride_changed(ride_doc)
         return ride_doc
 
     # ── Block 6 ───────────────────────────────────────────
@@ -136,118 +420,150 @@ class RideService:
         gender_filter:  str = 'All',     # Searching filter (All, Male, Female)
     ) -> list[dict]:
         """
-        5-step matching pipeline.
-        Returns a ranked list of ride dicts with enriched creator info.
+        5-step matching pipeline. Steps 1–2 come from the in-memory ride
+        index when it is enabled and warm, else from MongoDB cached per geo
+        cell + date; step 3 runs on that set, or server-side when neither
+        is in use. Returns a ranked list of ride dicts with enriched
+        creator info.
         """
         from database.mongo import get_users_collection
+        from .geometry import (
+            bboxes_intersect, cell_match_upper_bound, decode_polyline_array, expand_bbox,
+            ride_route_coords, route_bbox, route_overlap_decision, user_cell_neighbourhoods,
+        )
+        from .ride_index import ride_index
+        from .search_cache import search_cache
 
         rides      = get_rides_collection()
         users_col  = get_users_collection()
         user_oid   = ObjectId(user_id)
-        user_coords = decode_polyline(user_polyline)
+        user_coords = decode_polyline_array(user_polyline)
+
+        # User route bbox grown by the 100 m match threshold: a ride whose
+        # route bbox misses it cannot have a single overlapping point.
+        # Likewise, a user point can only match ride points in its
+        # neighbourhood of route cells.
+        user_bbox, user_cells = None, None
+        if len(user_coords) and min_overlap_pct > 0:
+            user_bbox  = expand_bbox(route_bbox(user_coords), 100.0)
+            user_cells = user_cell_neighbourhoods(user_coords)
+
+        # Mongo round trips issued by this search (surfaced in the debug log)
+        round_trips = 0
 
         # Get searching user's gender
-        searching_user = users_col.find_one({'_id': user_oid})
+        searching_user = users_col.find_one({'_id': user_oid}, {'gender': 1})
         searching_gender = (searching_user or {}).get('gender', 'Unknown')
+        round_trips += 1
 
-        # ── STEP 1 + 2  Filter by date & 500m geo radius ──
-        try:
-            cursor = rides.find({
-                'status':    'ACTIVE',
-                'ride_date': ride_date,
-                'start_location': {
-                    '$nearSphere': {
-                        '$geometry': {
-                            'type':        'Point',
-                            'coordinates': user_location,  # [lng, lat]
-                        },
-                        '$maxDistance': 2000,  # metres
-                    }
-                },
-            })
-            candidates = list(cursor)
-        except Exception as e:
-            print(f'[SEARCH GEO ERROR] {e}')
-            # Fallback: skip geo filter if 2dsphere index missing
-            candidates = list(rides.find({
-                'status':    'ACTIVE',
-                'ride_date': ride_date,
-            }))
+        # ── STEP 1 + 2  Date & free seats ─────────────────
+        query = {
+            'status':          'ACTIVE',
+            'ride_date':       ride_date,
+            'seats_available': {'$ne': False},     # missing on not-yet-backfilled rides
+        }
 
-        results = []
-        for ride in candidates:
+        # Polls for changed rides at most every few seconds; the first call
+        # only starts the index warm-up in the background.
+        round_trips += ride_index.refresh()
 
-            # ── STEP 3 — Exclusions ──────────────────────
-            # Skip own ride
-            if ride['creator_id'] == user_oid:
-                continue
+        if ride_index.ready:
+            # Candidates straight from this worker's in-memory ride index
+            source     = 'index'
+            candidates = _exclude_for_user(
+                ride_index.nearby(ride_date, user_location, SEARCH_RADIUS_M),
+                user_oid, user_location, searching_gender, gender_filter,
+            )
+        elif search_cache.enabled:
+            # Cell-wide candidates (2 km radius + creator $lookup), shared
+            # across callers; STEP 3 exclusions are applied per caller.
+            def load(center, radius_m):
+                nonlocal round_trips
+                round_trips += 1
+                return _fetch_candidates(rides, query, center, radius_m)
 
-            participants    = ride.get('participants', [])
-            approved_count  = sum(1 for p in participants if p.get('status') == 'APPROVED')
-            max_seats       = ride.get('max_seats', 1)
+            cell_candidates, hit = search_cache.get_candidates(user_location, ride_date, load)
+            source     = 'cache hit' if hit else 'cache miss'
+            candidates = _exclude_for_user(
+                cell_candidates, user_oid, user_location, searching_gender, gender_filter,
+            )
+        else:
+            # ── STEP 3 — Exclusions (server-side) ────────
+            query.update({
+                'creator_id':      {'$ne': user_oid},          # skip own ride
+                'participants.user_id': {'$ne': user_oid},     # skip if already a participant
+                # Creator must not mandate a different gender
+                'gender_preference': {'$in': ['Any', searching_gender, None]},
+            })
+            # Searcher must not mandate a different gender
+            if gender_filter != 'All':
+                query['creator_gender'] = gender_filter
 
-            # Skip full rides
-            if approved_count >= max_seats:
-                continue
+            # Route must share a cell with the user's route (multikey index);
+            # rides without a stored route always pass the overlap step.
+            if user_cells is not None:
+                query['$or'] = [
+                    {'route_cells': {'$in': [int(c) for c in set(user_cells.ravel().tolist())]}},
+                    {'route_cells': []},
+                    {'route_cells': {'$exists': False}},
+                ]
 
-            # Skip if already a participant
-            already_in = any(
-                p.get('user_id') == user_oid for p in participants
-            )
-            if already_in:
+            # 2 km geo radius + creator $lookup, ranked server-side
+            source = 'mongo'
+            round_trips += 1
+            candidates = _fetch_candidates(rides, query, user_location, SEARCH_RADIUS_M)
+
+        # ── STEP 4a — Cheap route prefilters ─────────────
+        shortlist = []
+        for ride in candidates:
+            # Full rides that predate seats_available pass the flag filter
+            if seats_left(ride) <= 0:
                 continue
 
-            # ── STEP 4 — Route overlap ───────────────────
-            ride_coords = decode_polyline(ride.get('route_polyline', ''))
-            overlap     = route_overlap_pct(user_coords, ride_coords)
-            if overlap < min_overlap_pct:
+            # Route bounding boxes don't come within 100 m
+            ride_bbox = (ride.get('route_geometry') or {}).get('bbox')
+            if user_bbox and ride_bbox and not bboxes_intersect(user_bbox, ride_bbox):
                 continue
 
-            # ── STEP 5 — Distance from $nearSphere ───────
-            # MongoDB $nearSphere returns docs sorted by distance already.
-            # Approximate distance using haversine of start_locations.
-            ride_loc = ride['start_location']['coordinates']  # [lng, lat]
-            dist_m   = haversine_m(
-                user_location[1], user_location[0],
-                ride_loc[1],      ride_loc[0],
-            )
+            # Upper bound on matching points from shared route cells
+            score = len(user_coords)
+            if user_cells is not None and ride.get('route_cells'):
+                score = cell_match_upper_bound(user_cells, ride['route_cells'])
+                if (score / len(user_coords)) * 100.0 < min_overlap_pct:
+                    continue
+            shortlist.append((ride, score))
 
-            # ── Enrich with creator info ─────────────────
-            creator = users_col.find_one({'_id': ride['creator_id']})
-            creator_name   = (creator or {}).get('full_name') or (creator or {}).get('phone', 'Unknown')
-            creator_rating = (creator or {}).get('rating', 0.0)
-            creator_gender = (creator or {}).get('gender', 'Unknown')
-
-            # ── Check Gender Compatibilities ─────────────
-            ride_pref = ride.get('gender_preference', 'Any')
-            
-            # 1. Does the CREATOR mandate a specific gender?
-            if ride_pref != 'Any' and ride_pref != searching_gender:
-                continue
-                
-            # 2. Does the SEARCHER mandate a specific gender?
-            if gender_filter != 'All' and gender_filter != creator_gender:
+        # ── STEP 4b — Exact overlap on every candidate whose bound passed ──
+        # The cell bound only prunes; it never ranks or truncates results.
+        # Candidates arrive ranked (distance ASC → rating DESC); keep that order.
+        results = []
+        for ride, _ in shortlist:
+
+            # Stops scanning as soon as pass/fail is certain
+            ride_coords = ride_route_coords(ride)
+            passes, _   = route_overlap_decision(user_coords, ride_coords, min_overlap_pct)
+            if not passes:
                 continue
 
+            # ── STEP 5 — Distance (from $geoNear / cell filter) ─
+            creator        = ride.get('creator') or {}
+            creator_name   = ride.get('creator_name') or creator.get('full_name') or creator.get('phone', 'Unknown')
+            creator_rating = creator.get('rating', 0.0)
+
             results.append({
                 'ride_id':          str(ride['_id']),
                 'creator_id':       str(ride['creator_id']),
                 'creator_name':     creator_name,
                 'creator_rating':   round(float(creator_rating), 1),
-                'creator_gender':   creator_gender,
-                'distance_meters':  round(dist_m),
-                'available_seats':  max_seats - approved_count,
+                'creator_gender':   creator.get('gender', 'Unknown'),
+                'distance_meters':  round(ride['distance_m']),
+                'available_seats':  seats_left(ride),
                 'ride_time':        ride.get('ride_time', ''),
                 'destination_name': ride.get('destination', {}).get('name', ''),
-                '_sort_rating':     float(creator_rating),
             })
 
-        # ── Rank: distance ASC  →  rating DESC ──────────
-        results.sort(key=lambda r: (r['distance_meters'], -r['_sort_rating']))
-
-        # Remove internal sort key before returning
-        for r in results:
-            r.pop('_sort_rating', None)
-
-        print(f'[SEARCH] User {user_id} → {len(results)} match(es) on {ride_date}')
+        print(
+            f'[SEARCH] User {user_id} → {len(results)} match(es) on {ride_date} '
+            f'({len(candidates)} candidate(s), {round_trips} mongo round trip(s), source {source})'
+        )
         return results
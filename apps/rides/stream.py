@@ -0,0 +1,160 @@
+"""
+Ride stream — Server-Sent Events for a single ride (ASGI)
+GET /rides/stream?ride_id=<ObjectId>   →  creator / participants only
+
+Sends one `snapshot` event with the current ride state, then only the
+deltas published by request/respond/complete/cancel (see events.py), so
+an idle ride costs nothing but a periodic keep-alive comment. The
+stream ends after the ride is COMPLETED or CANCELED.
+
+Each keep-alive also re-reads the ride status, so a stream still ends
+(with a `status` event) when the completion happened in a process its
+events backend does not reach.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from bson import ObjectId
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+
+from apps.verification.auth_middleware import check_verified_token
+from database.mongo import get_rides_collection
+from .events import ride_event, ride_events
+from .hydration import hydrate_ride
+
+# Comment line sent when no event arrived for this long (keeps proxies open)
+HEARTBEAT_SECONDS = 15
+
+_SNAPSHOT_PROJECTION = {
+    'creator_id': 1, 'creator_name': 1, 'creator_phone': 1, 'participants': 1,
+    'status': 1, 'approved_count': 1, 'max_seats': 1, 'completion_votes': 1,
+}
+
+
+def _bearer_token(request) -> str | None:
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return None
+
+
+def ride_status(ride_oid: ObjectId) -> str | None:
+    ride = get_rides_collection().find_one({'_id': ride_oid}, {'status': 1})
+    return ride.get('status') if ride else None
+
+
+async def terminal_status_event(ride_oid: ObjectId) -> dict | None:
+    """A `status` event if the ride left ACTIVE (checked on keep-alive ticks), else None."""
+    try:
+        current = await sync_to_async(ride_status, thread_sensitive=False)(ride_oid)
+    except Exception as e:
+        print(f'[RIDE_STREAM ERROR] {e}')
+        return None
+    if current == 'ACTIVE':
+        return None
+    return ride_event(ride_oid, 'status', status=current)     # None: ride deleted
+
+
+def load_snapshot(ride_oid: ObjectId, user_oid: ObjectId):
+    """(snapshot, None) for a ride the user belongs to, else (None, (error, status))."""
+    ride = get_rides_collection().find_one({'_id': ride_oid}, _SNAPSHOT_PROJECTION)
+    if not ride:
+        return None, ('Ride not found.', 404)
+
+    members = {ride['creator_id']} | {p.get('user_id') for p in ride.get('participants', [])}
+    if user_oid not in members:
+        return None, ('Only the creator or participants can follow this ride.', 403)
+
+    participants = hydrate_ride(ride)['participants']
+    approved     = sum(1 for p in participants if p['status'] == 'APPROVED')
+    # Same electorate as actions.vote_complete: creator + APPROVED participants
+    eligible     = {ride['creator_id']} | {p.get('user_id') for p in ride.get('participants', [])
+                                           if p.get('status') == 'APPROVED'}
+    return {
+        'ride_id':          str(ride_oid),
+        'status':           ride.get('status', ''),
+        'participants':     participants,
+        'approved_count':   ride.get('approved_count', approved),
+        'max_seats':        ride.get('max_seats', 1),
+        'completion_votes': len(ride.get('completion_votes', [])),
+        'majority_needed':  (len(eligible) // 2) + 1,
+    }, None
+
+
+def _sse(event_type: str, data: dict) -> str:
+    return f'event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+async def _event_stream(sub, ride_oid: ObjectId, snapshot: dict):
+    try:
+        yield _sse('snapshot', snapshot)
+        if snapshot['status'] != 'ACTIVE':
+            return
+
+        while True:
+            event = await sub.get(timeout=HEARTBEAT_SECONDS)
+            if event is None:
+                event = await terminal_status_event(ride_oid)
+                if event is None:
+                    yield ': ping\n\n'
+                    continue
+
+            yield _sse(event['type'], event)
+
+            if sub.overflowed:
+                # Deltas were dropped — end the stream so the client
+                # reconnects and starts from a fresh snapshot.
+                return
+            if event['type'] == 'status' and event.get('status') != 'ACTIVE':
+                return
+    finally:
+        sub.close()
+
+
+async def ride_stream(request):
+    """
+    GET /rides/stream?ride_id=<ObjectId>
+    Events (each also carries type, ride_id and `at`; built by events.ride_event):
+        snapshot     see load_snapshot
+        participant  {user_id, status, name, phone} on request,
+                     {user_id, status, approved_count} on approve/reject
+        vote         {votes, needed}
+        status       {status}   COMPLETED / CANCELED; the stream ends
+    Published by actions.py (request, respond, complete) and views.cancel_ride.
+    Needs the ASGI server: under WSGI the response would be buffered until
+    the ride ends, so it is refused with 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Ride streams need the ASGI server (config.asgi).'}, status=501)
+
+    payload, error = await sync_to_async(check_verified_token, thread_sensitive=False)(_bearer_token(request))
+    if error:
+        message, code = error
+        return JsonResponse({'error': message}, status=code)
+
+    try:
+        ride_oid = ObjectId(request.GET.get('ride_id'))
+        user_oid = ObjectId(payload['user_id'])
+    except Exception:
+        return JsonResponse({'error': 'Invalid ride_id.'}, status=400)
+
+    # Subscribe before reading the snapshot so no delta falls in between
+    sub = ride_events.subscribe(str(ride_oid))
+    try:
+        snapshot, error = await sync_to_async(load_snapshot, thread_sensitive=False)(ride_oid, user_oid)
+    except Exception as e:
+        sub.close()
+        print(f'[RIDE_STREAM ERROR] {e}')
+        return JsonResponse({'error': 'Failed to open ride stream.'}, status=500)
+
+    if error:
+        sub.close()
+        message, code = error
+        return JsonResponse({'error': message}, status=code)
+
+    print(f'[RIDE_STREAM] User {payload["user_id"]} ← ride {ride_oid}')
+    response = StreamingHttpResponse(_event_stream(sub, ride_oid, snapshot), content_type='text/event-stream')
+    response['Cache-Control']     = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'     # disable proxy buffering (nginx)
+    return response
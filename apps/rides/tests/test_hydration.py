@@ -0,0 +1,91 @@
+"""
+hydrate_ride reports the users queries it issued: none for a fully
+denormalized ride, one `$in` for rides with missing display copies.
+"""
+import pytest
+from bson import ObjectId
+
+from apps.rides import hydration
+from apps.rides.hydration import hydrate_ride
+
+CREATOR, ALICE, BOB = ObjectId(), ObjectId(), ObjectId()
+
+USERS = {
+    CREATOR: {'_id': CREATOR, 'full_name': 'Carl', 'phone': '+910'},
+    ALICE:   {'_id': ALICE,   'full_name': 'Alice', 'phone': '+911'},
+    BOB:     {'_id': BOB,     'phone': '+912'},
+}
+
+
+class _Users:
+    """Stand-in for the users collection; records every find()."""
+
+    def __init__(self):
+        self.finds = []
+
+    def find(self, query, projection=None):
+        ids = query['_id']['$in']
+        self.finds.append(sorted(map(str, ids)))
+        return [USERS[i] for i in ids if i in USERS]
+
+
+@pytest.fixture
+def users(monkeypatch):
+    collection = _Users()
+    monkeypatch.setattr(hydration, 'get_users_collection', lambda: collection)
+    return collection
+
+
+def _ride(creator_copy: bool, embedded: set) -> dict:
+    ride = {
+        'creator_id':   CREATOR,
+        'participants': [
+            {'user_id': CREATOR, 'status': 'APPROVED'},
+            {'user_id': BOB,     'status': 'PENDING'},
+            {'user_id': ALICE,   'status': 'APPROVED'},
+        ],
+    }
+    if creator_copy:
+        ride.update(creator_name='Carl', creator_phone='+910')
+    for p in ride['participants']:
+        if p['user_id'] in embedded:
+            p.update(name=USERS[p['user_id']].get('full_name') or USERS[p['user_id']]['phone'],
+                     phone=USERS[p['user_id']]['phone'])
+    return ride
+
+
+def test_denormalized_ride_needs_no_query(users):
+    hydrated = hydrate_ride(_ride(creator_copy=True, embedded={CREATOR, ALICE, BOB}))
+    assert hydrated['queries'] == 0
+    assert users.finds == []
+    assert hydrated['creator'] == {'name': 'Carl', 'phone': '+910'}
+
+
+@pytest.mark.parametrize('creator_copy, embedded', [
+    (True,  {CREATOR, ALICE}),            # one participant missing its copy
+    (False, {CREATOR, ALICE, BOB}),       # only the creator copy missing
+    (False, set()),                       # legacy ride: nothing embedded
+])
+def test_missing_copies_cost_one_query(users, creator_copy, embedded):
+    hydrated = hydrate_ride(_ride(creator_copy, embedded))
+    assert hydrated['queries'] == 1
+    assert len(users.finds) == 1
+    assert hydrated['creator'] == {'name': 'Carl', 'phone': '+910'}
+
+
+@pytest.mark.parametrize('embedded', [{CREATOR, ALICE, BOB}, {ALICE}, set()])
+def test_participant_order_and_fields_are_kept(users, embedded):
+    hydrated = hydrate_ride(_ride(creator_copy=False, embedded=embedded))
+    assert hydrated['participants'] == [
+        {'user_id': str(CREATOR), 'name': 'Carl',  'phone': '+910', 'status': 'APPROVED'},
+        {'user_id': str(BOB),     'name': '+912',  'phone': '+912', 'status': 'PENDING'},
+        {'user_id': str(ALICE),   'name': 'Alice', 'phone': '+911', 'status': 'APPROVED'},
+    ]
+
+
+def test_unknown_user_falls_back_to_placeholder(users):
+    ride = {'creator_id': CREATOR, 'creator_name': 'Carl',
+            'participants': [{'user_id': ObjectId(), 'status': 'PENDING'}]}
+    hydrated = hydrate_ride(ride)
+    assert hydrated['queries'] == 1
+    assert hydrated['participants'][0]['name'] == 'Unknown'
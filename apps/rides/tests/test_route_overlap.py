@@ -0,0 +1,67 @@
+"""
+The NumPy overlap engine (geometry.py) must agree with the scalar
+reference, services.route_overlap_pct, on fixed routes.
+"""
+import random
+
+import pytest
+
+from apps.rides.geometry import route_overlap_decision, route_overlap_pct_np
+from apps.rides.services import route_overlap_pct
+
+
+def _walk(n: int, seed: int, start=(23.0225, 72.5714), step_deg=0.0004):
+    """Deterministic random-walk route of n (lat, lng) points, ~40 m apart."""
+    rng = random.Random(seed)
+    lat, lng = start
+    coords = []
+    for _ in range(n):
+        lat += rng.uniform(-step_deg, step_deg * 2)
+        lng += rng.uniform(-step_deg, step_deg * 2)
+        coords.append((round(lat, 5), round(lng, 5)))
+    return coords
+
+
+def _route_pairs():
+    user = _walk(120, seed=1)
+    shared = user[:60]
+    return [
+        ('identical',     user, list(user)),
+        ('shared half',   user, shared + _walk(60, seed=2, start=(shared[-1][0] - 0.02, shared[-1][1] + 0.02))),
+        ('disjoint',      user, _walk(120, seed=3, start=(23.20, 72.80))),
+        ('parallel 80 m', user, [(lat + 0.00072, lng) for lat, lng in user]),
+        ('short ride',    user, user[10:15]),
+        ('empty ride',    user, []),
+        ('empty user',    [], user),
+        ('single points', [(23.0225, 72.5714)], [(23.0226, 72.5715)]),
+    ]
+
+
+PAIRS = _route_pairs()
+
+
+@pytest.mark.parametrize('name,user,ride', PAIRS, ids=[p[0] for p in PAIRS])
+def test_pct_matches_scalar(name, user, ride):
+    assert route_overlap_pct_np(user, ride) == pytest.approx(route_overlap_pct(user, ride))
+
+
+@pytest.mark.parametrize('threshold_m', [25.0, 100.0, 500.0])
+@pytest.mark.parametrize('name,user,ride', PAIRS, ids=[p[0] for p in PAIRS])
+def test_pct_matches_scalar_across_thresholds(name, user, ride, threshold_m):
+    assert route_overlap_pct_np(user, ride, threshold_m) == pytest.approx(
+        route_overlap_pct(user, ride, threshold_m)
+    )
+
+
+@pytest.mark.parametrize('min_overlap_pct', [0.0, 10.0, 49.5, 50.0, 75.0, 100.0])
+@pytest.mark.parametrize('name,user,ride', PAIRS, ids=[p[0] for p in PAIRS])
+def test_decision_matches_scalar(name, user, ride, min_overlap_pct):
+    expected = route_overlap_pct(user, ride)
+    passes, pct = route_overlap_decision(user, ride, min_overlap_pct)
+    assert passes == (expected >= min_overlap_pct)
+    if pct is not None:
+        assert pct == pytest.approx(expected)
+
+    passes, pct = route_overlap_decision(user, ride, min_overlap_pct, exact=True)
+    assert passes == (expected >= min_overlap_pct)
+    assert pct == pytest.approx(expected)
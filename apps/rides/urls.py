@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import stream, views
 
 urlpatterns = [
     path('create',      views.create_ride,    name='create_ride'),
@@ -11,4 +11,5 @@ urlpatterns = [
     path('my-requests', views.my_requests,    name='my_requests'),
     path('cancel',      views.cancel_ride,    name='cancel_ride'),
     path('detail',       views.ride_detail,    name='ride_detail'),
+    path('stream',      stream.ride_stream,   name='ride_stream'),    # SSE (ASGI)
 ]
@@ -11,8 +11,11 @@ from bson import ObjectId
 
 from apps.verification.auth_middleware import verified_required
 from database.mongo import get_users_collection, get_rides_collection
-from .services import RideService
-from apps.users.notifications import send_push_notification, send_bulk_notifications
+from . import actions
+from .services import RideService, build_my_requests_pipeline
+from .events import publish_ride_event
+from .hydration import USER_DISPLAY_PROJECTION, display_name, hydrate_ride
+from apps.users.notifications import send_bulk_notifications
 
 
 # ─────────────────────────────────────────────────────────
@@ -99,6 +102,9 @@ def create_ride(request):
             max_seats=max_seats,
             route_polyline=route_polyline,
             gender_preference=gender_preference,
+            creator_gender=user.get('gender', 'Unknown'),
+            creator_name=display_name(user),
+            creator_phone=user.get('phone', ''),
         )
 
         print(f'[RIDE_CREATE] User {user_id} → {destination["name"]} on {ride_date_str} (Prefer: {gender_preference})')
@@ -171,6 +177,7 @@ def search_rides(request):
             user_location = [float(user_location[0]), float(user_location[1])],
             ride_date     = ride_date_str,
             user_polyline = route_polyline,
+            gender_filter = gender_filter,
         )
 
         return Response(matches, status=status.HTTP_200_OK)
@@ -196,7 +203,8 @@ def request_ride(request):
     - Caller cannot be the creator
     - Caller not already a participant (any status)
     - Approved seats < max_seats
-    Adds participant with status=PENDING.
+    Adds participant with status=PENDING in one conditional update;
+    the failing rule is only looked up when that update misses.
     """
     try:
         user_id = request.user_id
@@ -211,59 +219,8 @@ def request_ride(request):
         except Exception:
             return Response({'error': 'Invalid ride_id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        rides = get_rides_collection()
-        ride  = rides.find_one({'_id': ride_oid})
-
-        if not ride:
-            return Response({'error': 'Ride not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Must be ACTIVE
-        if ride.get('status') != 'ACTIVE':
-            return Response({'error': 'This ride is no longer active.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Cannot request own ride
-        if ride['creator_id'] == user_oid:
-            return Response({'error': 'You cannot request to join your own ride.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        participants = ride.get('participants', [])
-
-        # Already a participant (any status)
-        already = next((p for p in participants if p.get('user_id') == user_oid), None)
-        if already:
-            existing_status = already.get('status', '')
-            if existing_status == 'PENDING':
-                return Response({'error': 'Your request is already pending.'}, status=status.HTTP_409_CONFLICT)
-            if existing_status == 'APPROVED':
-                return Response({'error': 'You are already in this ride.'}, status=status.HTTP_409_CONFLICT)
-            if existing_status == 'REJECTED':
-                return Response({'error': 'Your request was rejected by the creator.'}, status=status.HTTP_409_CONFLICT)
-
-        # Seat check — count only APPROVED participants
-        approved_count = sum(1 for p in participants if p.get('status') == 'APPROVED')
-        if approved_count >= ride.get('max_seats', 1):
-            return Response({'error': 'This ride is full.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Atomic push
-        rides.update_one(
-            {'_id': ride_oid},
-            {'$push': {'participants': {'user_id': user_oid, 'status': 'PENDING'}}},
-        )
-
-        print(f'[RIDE_REQUEST] User {user_id} → ride {ride_id_str}')
-
-        # Notify the ride creator
-        users = get_users_collection()
-        requester = users.find_one({'_id': user_oid}, {'full_name': 1, 'phone': 1})
-        requester_name = (requester or {}).get('full_name') or (requester or {}).get('phone', 'Someone')
-        dest_name = ride.get('destination', {}).get('name', 'a ride')
-        send_push_notification(
-            ride['creator_id'],
-            'New Ride Request 🙋',
-            f'{requester_name} wants to join your ride to {dest_name}',
-            {'type': 'ride_request', 'ride_id': ride_id_str},
-        )
-
-        return Response({'message': 'Request sent'}, status=status.HTTP_200_OK)
+        body, code = actions.request_join(ride_oid, user_oid)
+        return Response(body, status=code)
 
     except Exception as e:
         print(f'[RIDE_REQUEST ERROR] {e}')
@@ -284,8 +241,8 @@ def respond_ride(request):
     Rules:
     - Only the ride creator can call this
     - Ride must be ACTIVE
-    - Target participant must exist
-    - APPROVE: re-check seat count (avoid race conditions)
+    - Target participant must exist and still be PENDING
+    - APPROVE: approved_count < max_seats, checked in the update filter
     - Uses positional $ operator for atomic participant update
     """
     try:
@@ -310,71 +267,8 @@ def respond_ride(request):
         except Exception:
             return Response({'error': 'Invalid ObjectId.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        rides = get_rides_collection()
-        ride  = rides.find_one({'_id': ride_oid})
-
-        if not ride:
-            return Response({'error': 'Ride not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Only creator
-        if ride['creator_id'] != caller_oid:
-            return Response({'error': 'Only the ride creator can respond to requests.'}, status=status.HTTP_403_FORBIDDEN)
-
-        # Must be ACTIVE
-        if ride.get('status') != 'ACTIVE':
-            return Response({'error': 'Cannot respond after the ride is completed or cancelled.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        participants = ride.get('participants', [])
-
-        # Find target participant
-        target = next((p for p in participants if p.get('user_id') == target_oid), None)
-        if not target:
-            return Response({'error': 'User has not requested to join this ride.'}, status=status.HTTP_404_NOT_FOUND)
-
-        if target.get('status') != 'PENDING':
-            return Response(
-                {'error': f'Request is already {target["status"].lower()}.'},
-                status=status.HTTP_409_CONFLICT,
-            )
-
-        if action == 'APPROVE':
-            # Re-check seats (prevent race conditions)
-            approved_count = sum(1 for p in participants if p.get('status') == 'APPROVED')
-            if approved_count >= ride.get('max_seats', 1):
-                return Response({'error': 'Ride is full. Cannot approve more riders.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        new_status = 'APPROVED' if action == 'APPROVE' else 'REJECTED'
-
-        # Atomic positional update
-        result = rides.update_one(
-            {'_id': ride_oid, 'participants.user_id': target_oid},
-            {'$set': {'participants.$.status': new_status}},
-        )
-
-        if result.modified_count == 0:
-            return Response({'error': 'Update failed. Please try again.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        msg = 'User approved' if action == 'APPROVE' else 'User rejected'
-        print(f'[RIDE_RESPOND] Creator {caller_id} → {action} user {target_id_str} on ride {ride_id_str}')
-
-        # Notify the requesting user about outcome
-        dest_name = ride.get('destination', {}).get('name', 'the ride')
-        if action == 'APPROVE':
-            send_push_notification(
-                target_oid,
-                'Request Approved ✅',
-                f'Your request to join the ride to {dest_name} was approved!',
-                {'type': 'ride_approved', 'ride_id': ride_id_str},
-            )
-        else:
-            send_push_notification(
-                target_oid,
-                'Request Declined',
-                f'Your request to join the ride to {dest_name} was declined.',
-                {'type': 'ride_rejected', 'ride_id': ride_id_str},
-            )
-
-        return Response({'message': msg}, status=status.HTTP_200_OK)
+        body, code = actions.respond_request(ride_oid, caller_oid, target_oid, action)
+        return Response(body, status=code)
 
     except Exception as e:
         print(f'[RIDE_RESPOND ERROR] {e}')
@@ -395,9 +289,10 @@ def complete_ride(request):
     Majority vote logic:
     - eligible = creator + all APPROVED participants
     - majority_needed = floor(len(eligible) / 2) + 1
-    - Adds caller to completion_votes ($addToSet, idempotent)
-    - If votes >= majority_needed → COMPLETED + timestamp
+    - Adds caller to completion_votes ($setUnion, idempotent)
+    - If votes >= majority_needed → COMPLETED + timestamp, in the same update
     - On completion: increments total_buddy_matches for all eligible users
+      (only in the request whose vote completed the ride)
     """
     try:
         caller_id   = request.user_id
@@ -412,78 +307,8 @@ def complete_ride(request):
         except Exception:
             return Response({'error': 'Invalid ride_id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        rides = get_rides_collection()
-        ride  = rides.find_one({'_id': ride_oid})
-
-        if not ride:
-            return Response({'error': 'Ride not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-        if ride.get('status') != 'ACTIVE':
-            return Response({'error': 'Ride is not active.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Build eligible set: creator + APPROVED participants
-        participants = ride.get('participants', [])
-        approved_ids = [p['user_id'] for p in participants if p.get('status') == 'APPROVED']
-        creator_oid  = ride['creator_id']
-        eligible     = list({creator_oid} | set(approved_ids))   # deduplicated
-
-        if caller_oid not in eligible:
-            return Response(
-                {'error': 'Only the creator or approved participants can complete a ride.'},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
-        # Atomic: add vote (idempotent — $addToSet ignores duplicates)
-        rides.update_one(
-            {'_id': ride_oid},
-            {'$addToSet': {'completion_votes': caller_oid}},
-        )
-
-        # Re-fetch to get updated vote count
-        ride         = rides.find_one({'_id': ride_oid})
-        current_votes = ride.get('completion_votes', [])
-        majority_needed = (len(eligible) // 2) + 1
-
-        print(f'[COMPLETE] ride={ride_id_str} votes={len(current_votes)}/{majority_needed}')
-
-        if len(current_votes) >= majority_needed:
-            # Mark ride as COMPLETED
-            rides.update_one(
-                {'_id': ride_oid},
-                {'$set': {'status': 'COMPLETED', 'completed_at': datetime.utcnow()}},
-            )
-
-            # Increment total_buddy_matches for all eligible users
-            users = get_users_collection()
-            users.update_many(
-                {'_id': {'$in': eligible}},
-                {'$inc': {'total_buddy_matches': 1}},
-            )
-
-            print(f'[COMPLETE] Ride {ride_id_str} COMPLETED — {len(eligible)} buddies matched')
-
-            # Notify all participants
-            dest_name = ride.get('destination', {}).get('name', 'your destination')
-            other_ids = [uid for uid in eligible if uid != caller_oid]
-            if other_ids:
-                send_bulk_notifications(
-                    other_ids,
-                    'Ride Completed 🎉',
-                    f'Your ride to {dest_name} has been completed! Don\'t forget to leave a review.',
-                    {'type': 'ride_completed', 'ride_id': ride_id_str},
-                )
-
-            return Response({'message': 'Ride completed', 'status': 'COMPLETED'}, status=status.HTTP_200_OK)
-
-        # Vote recorded but not yet majority
-        return Response(
-            {
-                'message': 'Vote recorded',
-                'votes': len(current_votes),
-                'needed': majority_needed,
-            },
-            status=status.HTTP_200_OK,
-        )
+        body, code = actions.vote_complete(ride_oid, caller_oid)
+        return Response(body, status=code)
 
     except Exception as e:
         print(f'[RIDE_COMPLETE ERROR] {e}')
@@ -530,7 +355,9 @@ def cancel_ride(request):
         if ride.get('status') != 'ACTIVE':
             return Response({'error': 'Only active rides can be canceled.'}, status=status.HTTP_400_BAD_REQUEST)
             
-        rides.update_one({'_id': ride_oid}, {'$set': {'status': 'CANCELED'}})
+        rides.update_one({'_id': ride_oid}, {'$set': {'status': 'CANCELED', 'updated_at': datetime.utcnow()}})
+        RideService.ride_changed(ride)
+        publish_ride_event(ride_oid, 'status', status='CANCELED')
 
         # Notify all approved participants
         participants = ride.get('participants', [])
@@ -593,16 +420,8 @@ def my_active_ride(request):
         if not ride:
             return Response({'ride': None}, status=status.HTTP_200_OK)
 
-        # Enrich participants with names
-        users      = get_users_collection()
-        enriched   = []
-        for p in ride.get('participants', []):
-            uid   = p.get('user_id')
-            pstat = p.get('status', '')
-            user  = users.find_one({'_id': uid}, {'full_name': 1, 'phone': 1})
-            name  = (user or {}).get('full_name') or (user or {}).get('phone', 'Unknown')
-            phone = (user or {}).get('phone', '')
-            enriched.append({'user_id': str(uid), 'name': name, 'phone': phone, 'status': pstat})
+        # Enrich participants with names (one batched users query)
+        enriched = hydrate_ride(ride)['participants']
 
         votes_count = len(ride.get('completion_votes', []))
         approved_count = sum(1 for p in enriched if p['status'] == 'APPROVED')
@@ -648,39 +467,28 @@ def my_requests(request):
         caller_oid = ObjectId(caller_id)
 
         rides = get_rides_collection()
-        users = get_users_collection()
 
-        cursor = rides.find({
-            'status': 'ACTIVE',
-            'creator_id': {'$ne': caller_oid},
-            'participants': {
-                '$elemMatch': {
-                    'user_id': caller_oid,
-                    'status': {'$in': ['PENDING', 'APPROVED', 'REJECTED']},
-                }
+        # Single aggregation: caller's entry picked out via $filter
+        entries = [r for r in rides.aggregate(build_my_requests_pipeline(caller_oid)) if r.get('my_entry')]
+
+        # Rides from before names were denormalized: one batched lookup
+        missing = {r['creator_id'] for r in entries if 'creator_name' not in r}
+        names = {}
+        if missing:
+            names = {
+                u['_id']: display_name(u)
+                for u in get_users_collection().find({'_id': {'$in': list(missing)}}, USER_DISPLAY_PROJECTION)
             }
-        })
 
         result = []
-        for ride in cursor:
-            # Find this caller's participant entry
-            my_entry = next(
-                (p for p in ride.get('participants', []) if p.get('user_id') == caller_oid),
-                None,
-            )
-            if not my_entry:
-                continue
-
-            creator = users.find_one({'_id': ride['creator_id']}, {'full_name': 1, 'phone': 1})
-            creator_name = (creator or {}).get('full_name') or (creator or {}).get('phone', 'Unknown')
-
+        for ride in entries:
             result.append({
                 'ride_id':          str(ride['_id']),
                 'ride_time':        ride.get('ride_time', ''),
                 'destination_name': ride.get('destination', {}).get('name', ''),
-                'creator_name':     creator_name,
+                'creator_name':     ride.get('creator_name') or names.get(ride['creator_id'], 'Unknown'),
                 'creator_id':       str(ride['creator_id']),
-                'my_status':        my_entry.get('status', ''),
+                'my_status':        ride['my_entry'].get('status', ''),
             })
 
         return Response({'requests': result}, status=status.HTTP_200_OK)
@@ -712,25 +520,15 @@ def ride_detail(request):
             return Response({'error': 'ride_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
         rides = get_rides_collection()
-        users = get_users_collection()
 
         ride = rides.find_one({'_id': ObjectId(ride_id)})
         if not ride:
             return Response({'error': 'Ride not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Enrich participants with names
-        enriched = []
-        for p in ride.get('participants', []):
-            uid = p.get('user_id')
-            pstat = p.get('status', '')
-            user = users.find_one({'_id': uid}, {'full_name': 1, 'phone': 1})
-            name = (user or {}).get('full_name') or (user or {}).get('phone', 'Unknown')
-            phone = (user or {}).get('phone', '')
-            enriched.append({'user_id': str(uid), 'name': name, 'phone': phone, 'status': pstat})
-
-        # Creator info
-        creator = users.find_one({'_id': ride['creator_id']}, {'full_name': 1, 'phone': 1})
-        creator_name = (creator or {}).get('full_name') or (creator or {}).get('phone', 'Unknown')
+        # Participants + creator info (one batched users query)
+        hydrated     = hydrate_ride(ride)
+        enriched     = hydrated['participants']
+        creator_name = hydrated['creator']['name']
 
         dest = ride.get('destination', {})
 
@@ -0,0 +1,212 @@
+"""
+Ride channel — bidirectional WebSocket per ride (raw ASGI, see config/asgi.py)
+ws(s)://<host>/ws/rides/<ride_id>   with   Authorization: Bearer <jwt>
+
+The JWT + VERIFIED check (check_verified_token) runs once, at connect.
+The token is only accepted as a header: query strings end up in access
+and proxy logs.
+
+server → client
+    {"type": "snapshot", ...}            current ride state (members only)
+    {"type": "participant" | "vote" | "status", ...}
+                                         the same deltas as /rides/stream
+    {"type": "result", "ref", "status", "body"}
+                                         reply to a client action; status and
+                                         body match the HTTP endpoint's response
+client → server
+    {"action": "request"}                rider asks to join   (POST /rides/request)
+    {"action": "approve" | "reject", "user_id": "<id>"}
+                                         creator responds     (POST /rides/respond)
+    {"action": "complete"}               vote to complete     (POST /rides/complete)
+    An optional "ref" is echoed back in the result.
+
+Anyone verified may connect (to send "request"); ride events are only
+forwarded to the creator and participants. The socket closes after the
+ride is COMPLETED or CANCELED. Close codes: 4400 bad ride id,
+4401/4403 auth, 4404 ride not found.
+"""
+import asyncio
+import json
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from bson import ObjectId
+
+from apps.verification.auth_middleware import check_verified_token
+from . import actions
+from .events import ride_events
+from .stream import HEARTBEAT_SECONDS, load_snapshot, terminal_status_event
+
+logger = logging.getLogger(__name__)
+
+_PATH = re.compile(r'^/ws/rides/(?P<ride_id>[^/]+)/?$')
+
+
+def _run_sync(fn):
+    # Blocking Mongo work runs on the default thread pool, not Django's single
+    # thread-sensitive executor, so channels don't queue behind each other.
+    return sync_to_async(fn, thread_sensitive=False)
+
+
+def _token(scope) -> str | None:
+    for name, value in scope.get('headers', []):
+        if name == b'authorization' and value.startswith(b'Bearer '):
+            return value[7:].decode()
+    return None
+
+
+async def _reject(send, code: int):
+    # Accept first so the client sees the close code (closing before
+    # accept turns into a bare HTTP 403 on the handshake)
+    await send({'type': 'websocket.accept'})
+    await send({'type': 'websocket.close', 'code': code})
+
+
+def _run_action(message: dict, ride_oid: ObjectId, user_oid: ObjectId) -> tuple[dict, int]:
+    action = str(message.get('action', '')).lower()
+    if action == 'request':
+        return actions.request_join(ride_oid, user_oid)
+    if action in ('approve', 'reject'):
+        try:
+            target_oid = ObjectId(message.get('user_id'))
+        except Exception:
+            return {'error': 'Invalid user_id.'}, 400
+        return actions.respond_request(ride_oid, user_oid, target_oid, action.upper())
+    if action == 'complete':
+        return actions.vote_complete(ride_oid, user_oid)
+    return {'error': 'action must be request, approve, reject or complete.'}, 400
+
+
+class _Channel:
+    """One connected socket: reader (client actions) + writer (ride events)."""
+
+    def __init__(self, send, ride_oid: ObjectId, user_oid: ObjectId, sub, member: bool):
+        self._send     = send
+        self._lock     = asyncio.Lock()
+        self.ride_oid  = ride_oid
+        self.user_oid  = user_oid
+        self.sub       = sub
+        self.member    = member
+        self.closed    = False
+        self.busy      = False     # a client action is in flight
+        self.finished  = False     # ride reached a terminal status
+
+    async def send_json(self, data: dict):
+        async with self._lock:
+            if not self.closed:
+                await self._send({'type': 'websocket.send', 'text': json.dumps(data, default=str)})
+
+    async def close(self, code: int = 1000):
+        async with self._lock:
+            if not self.closed:
+                self.closed = True
+                await self._send({'type': 'websocket.close', 'code': code})
+
+    async def read(self, receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                self.closed = True
+                return
+            if message['type'] != 'websocket.receive':
+                continue
+            try:
+                data = json.loads(message.get('text') or message.get('bytes') or b'')
+                if not isinstance(data, dict):
+                    raise ValueError
+            except ValueError:
+                await self.send_json({'type': 'result', 'ref': None, 'status': 400,
+                                      'body': {'error': 'Messages must be JSON objects.'}})
+                continue
+
+            self.busy = True
+            try:
+                body, code = await _run_sync(_run_action)(data, self.ride_oid, self.user_oid)
+            except Exception:
+                logger.exception('Ride channel action %r failed (ride=%s user=%s)',
+                                 data.get('action'), self.ride_oid, self.user_oid)
+                body, code = {'error': 'Action failed.'}, 500
+
+            if code == 200 and str(data.get('action', '')).lower() == 'request':
+                self.member = True
+            await self.send_json({'type': 'result', 'ref': data.get('ref'), 'status': code, 'body': body})
+            self.busy = False
+            if self.finished:
+                await self.close()
+
+    async def write(self):
+        while not self.closed:
+            event = await self.sub.get(timeout=HEARTBEAT_SECONDS)
+            if not self.member:
+                continue
+            if event is None:
+                # Idle tick: catch a completion the events backend missed
+                event = await terminal_status_event(self.ride_oid)
+                if event is None:
+                    continue
+
+            if self.sub.overflowed:
+                # Deltas were dropped — discard the queued ones too (older
+                # than the snapshot) and resync from a fresh snapshot
+                self.sub.drain()
+                snapshot, _ = await _run_sync(load_snapshot)(self.ride_oid, self.user_oid)
+                if not snapshot:
+                    continue
+                await self.send_json({'type': 'snapshot', **snapshot})
+                terminal = snapshot['status'] != 'ACTIVE'
+            else:
+                await self.send_json(event)
+                terminal = event['type'] == 'status' and event.get('status') != 'ACTIVE'
+
+            if terminal:
+                # The vote that completed the ride may still be waiting for
+                # its result; the reader closes after replying in that case.
+                self.finished = True
+                if not self.busy:
+                    await self.close()
+                return
+
+
+async def ride_channel(scope, receive, send):
+    """ASGI app for /ws/rides/<ride_id>."""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+
+    match = _PATH.match(scope.get('path', ''))
+    try:
+        ride_oid = ObjectId(match.group('ride_id'))
+    except Exception:
+        await _reject(send, 4400)
+        return
+
+    # Authenticate once for the lifetime of the connection
+    payload, error = await _run_sync(check_verified_token)(_token(scope))
+    if error:
+        await _reject(send, 4000 + error[1])
+        return
+    user_oid = ObjectId(payload['user_id'])
+
+    # Subscribe before reading the snapshot so no delta falls in between
+    sub = ride_events.subscribe(str(ride_oid))
+    try:
+        snapshot, error = await _run_sync(load_snapshot)(ride_oid, user_oid)
+        if error and error[1] == 404:
+            await _reject(send, 4404)
+            return
+
+        channel = _Channel(send, ride_oid, user_oid, sub, member=snapshot is not None)
+        await send({'type': 'websocket.accept'})
+        if snapshot:
+            await channel.send_json({'type': 'snapshot', **snapshot})
+            if snapshot['status'] != 'ACTIVE':
+                await channel.close()
+                return
+
+        writer = asyncio.ensure_future(channel.write())
+        try:
+            await channel.read(receive)
+        finally:
+            writer.cancel()
+    finally:
+        sub.close()
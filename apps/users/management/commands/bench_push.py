@@ -0,0 +1,105 @@
+"""
+Benchmark: Expo push fan-out throughput against a local stub server.
+
+    python manage.py bench_push
+    python manage.py bench_push --sizes 10 1000 100000 --latency-ms 50
+    python manage.py bench_push --concurrency 2 4 6 8
+
+Starts a stub Expo endpoint on 127.0.0.1 that answers every message with an
+"ok" ticket after --latency-ms (Expo's own response time is the dominant
+cost in production). Each fan-out size is sent twice: the old way — one
+fresh requests.post per 100-message chunk, one after another — and through
+PushTransport (pooled keep-alive connections, chunks in parallel).
+Nothing leaves the machine; no database access.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from apps.users.push import PushTransport, chunked
+
+
+def _stub_server(latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version        = 'HTTP/1.1'     # keep-alive, like Expo
+        wbufsize                = 1 << 16        # headers + body in one write
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            messages = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(latency)
+            body = json.dumps({'data': [{'status': 'ok', 'id': f'r{i}'} for i in range(len(messages))]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _unpooled(messages: list[dict], url: str) -> int:
+    ok = 0
+    for chunk in chunked(messages):
+        resp = requests.post(url, json=chunk, headers={'Accept': 'application/json'}, timeout=15)
+        ok += sum(1 for t in resp.json()['data'] if t['status'] == 'ok')
+    return ok
+
+
+class Command(BaseCommand):
+    help = 'Benchmark push fan-out: unpooled sequential requests vs the pooled concurrent transport.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 1000, 100000],
+                            help='Fan-out sizes (messages) to benchmark.')
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[6],
+                            help='PushTransport parallelism levels to try.')
+        parser.add_argument('--latency-ms', type=float, default=20,
+                            help='Simulated Expo response time per request.')
+        parser.add_argument('--baseline-max', type=int, default=100000,
+                            help='Skip the unpooled baseline above this many messages.')
+
+    def handle(self, *args, **opts):
+        server = _stub_server(opts['latency_ms'] / 1000)
+        url    = f'http://127.0.0.1:{server.server_port}/--/api/v2/push/send'
+        self.stdout.write(f'Stub Expo at {url} ({opts["latency_ms"]:.0f} ms per request)\n')
+        self.stdout.write(f'{"messages":>9} {"mode":<22} {"time":>9} {"msg/s":>10} {"ok":>8}')
+
+        try:
+            for n in opts['sizes']:
+                messages = [
+                    {'to': f'ExponentPushToken[bench-{i}]', 'sound': 'default',
+                     'title': 'Bench', 'body': 'Benchmark message', 'data': {}}
+                    for i in range(n)
+                ]
+
+                if n <= opts['baseline_max']:
+                    t0 = time.perf_counter()
+                    ok = _unpooled(messages, url)
+                    self._row(n, 'unpooled sequential', time.perf_counter() - t0, ok)
+
+                for concurrency in opts['concurrency']:
+                    transport = PushTransport(url=url, concurrency=concurrency)
+                    try:
+                        t0      = time.perf_counter()
+                        tickets = transport.send(messages)
+                        elapsed = time.perf_counter() - t0
+                    finally:
+                        transport.close()
+                    ok = sum(1 for t in tickets if t.get('status') == 'ok')
+                    self._row(n, f'pooled x{concurrency}', elapsed, ok)
+        finally:
+            server.shutdown()
+
+    def _row(self, n: int, mode: str, seconds: float, ok: int):
+        self.stdout.write(f'{n:>9} {mode:<22} {seconds * 1000:>7.0f}ms {n / seconds:>10,.0f} {ok:>8}')
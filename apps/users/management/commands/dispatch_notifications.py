@@ -0,0 +1,59 @@
+"""
+Drain the notification outbox into Expo.
+
+    python manage.py dispatch_notifications                    # run forever
+    python manage.py dispatch_notifications --once             # drain what is due, then exit
+    python manage.py dispatch_notifications --expo-url http://127.0.0.1:8765/push
+
+Request handlers only enqueue (apps/users/notifications.py); this worker
+claims due entries, sends them and reschedules transient failures with
+exponential backoff (apps/users/outbox.py). Several workers can run side
+by side. --expo-url points it at a stub endpoint for offline testing.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.users.outbox import dispatch_once
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued push notifications from notification_outbox, with retries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expo-url', default=None,
+                            help='Push endpoint (default: settings.EXPO_PUSH_URL).')
+        parser.add_argument('--batch', type=int, default=50, help='Entries claimed per round.')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds to sleep when nothing is due.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no entry is due instead of polling.')
+
+    def handle(self, *args, **opts):
+        url = opts['expo_url'] or settings.EXPO_PUSH_URL
+        self.stdout.write(f'Dispatching notifications to {url}')
+
+        totals = {'SENT': 0, 'PENDING': 0, 'FAILED': 0}
+        try:
+            while True:
+                try:
+                    counts = dispatch_once(opts['batch'], url)
+                except Exception as e:
+                    # Mongo hiccup — keep the worker alive
+                    self.stderr.write(f'[OUTBOX ERROR] {e}')
+                    time.sleep(opts['poll'])
+                    continue
+
+                for status, n in counts.items():
+                    totals[status] += n
+                if not any(counts.values()):
+                    if opts['once']:
+                        break
+                    time.sleep(opts['poll'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'sent {totals["SENT"]}, rescheduled {totals["PENDING"]}, failed {totals["FAILED"]}'
+        ))
@@ -0,0 +1,66 @@
+"""
+Look up Expo push receipts and prune tokens of uninstalled apps.
+
+    python manage.py poll_push_receipts --once          # e.g. from cron every 15 min
+    python manage.py poll_push_receipts                 # loop, every --interval seconds (Procfile `receipts`)
+    python manage.py poll_push_receipts --once --receipts-url http://127.0.0.1:8765/getReceipts
+
+Reads the tickets the dispatch_notifications worker recorded on outbox
+entries, fetches receipts 1000 ids per request and removes
+`expo_push_token` from users whose device is no longer registered
+(apps/users/receipts.py). In the loop, a failed round (Mongo or Expo
+unreachable) is logged and retried with exponential backoff.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.users.receipts import poll_once
+
+# First retry delay after a failed round; doubles up to --interval
+_RETRY_SECONDS = 5
+
+
+class Command(BaseCommand):
+    help = 'Poll Expo push receipts and remove DeviceNotRegistered push tokens.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receipts-url', default=None,
+                            help='Receipts endpoint (default: settings.EXPO_RECEIPTS_URL).')
+        parser.add_argument('--batch', type=int, default=500, help='Outbox entries checked per round.')
+        parser.add_argument('--interval', type=float, default=300,
+                            help='Seconds between rounds when nothing is due.')
+        parser.add_argument('--once', action='store_true',
+                            help='Check everything currently due, then exit.')
+
+    def handle(self, *args, **opts):
+        totals = {}
+        retry  = _RETRY_SECONDS
+        try:
+            while True:
+                try:
+                    stats = poll_once(opts['batch'], opts['receipts_url'])
+                except Exception as e:
+                    # Keep the poller alive; --once leaves the retry to its scheduler
+                    self.stderr.write(f'[PUSH RECEIPTS ERROR] {e}')
+                    if opts['once']:
+                        break
+                    time.sleep(retry)
+                    retry = min(retry * 2, max(opts['interval'], _RETRY_SECONDS))
+                    continue
+
+                retry = _RETRY_SECONDS
+                for key, n in stats.items():
+                    totals[key] = totals.get(key, 0) + n
+                if stats['entries'] < opts['batch']:
+                    if opts['once']:
+                        break
+                    time.sleep(opts['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals.get("entries", 0)} entries, {totals.get("receipts", 0)} receipts '
+            f'({totals.get("errors", 0)} errors), {totals.get("pending", 0)} not ready, '
+            f'{totals.get("pruned", 0)} token(s) pruned'
+        ))
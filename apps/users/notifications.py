@@ -2,89 +2,126 @@
 Push Notification Utility — Expo Push Notifications
 Sends notifications via Expo's push service (https://exp.host/--/api/v2/push/send).
 No FCM/APNs configuration required for Expo Go / dev builds.
+
+Request handlers never talk to Expo: send_push_notification and
+send_bulk_notifications only insert an entry into the `notification_outbox`
+collection. The dispatch_notifications worker (apps/users/outbox.py)
+resolves push tokens and delivers, retrying with exponential backoff.
+
+Single-recipient notifications sent with a `summary` are coalesced per
+(recipient, type, ride). The first one is sent at once and opens a window
+of NOTIFICATION_COALESCE_SECONDS; later ones inside the window are held
+in one entry that goes out when the window ends (and opens the next
+one) — the summary, with `{count}` filled in, when more than one
+distinct message was merged. Identical bodies inside a window are only
+sent once.
 """
-import requests
+from datetime import datetime, timedelta, timezone
+
 from bson import ObjectId
-from database.mongo import get_users_collection
+from django.conf import settings
+from pymongo.errors import DuplicateKeyError
+from database.mongo import get_notification_outbox_collection
+
+
+def _oid(user_id):
+    return ObjectId(user_id) if isinstance(user_id, str) else user_id
 
-EXPO_PUSH_URL = 'https://exp.host/--/api/v2/push/send'
 
+def coalesce_key(user_id, data: dict) -> str:
+    return f'{_oid(user_id)}:{data.get("type", "")}:{data.get("ride_id", "")}'
+
+
+def _enqueue_coalesced(user_id, title: str, body: str, data: dict, summary: str):
+    """Send now and open a window, or hold until the key's current window ends."""
+    outbox = get_notification_outbox_collection()
+    now    = datetime.now(timezone.utc)
+    key    = coalesce_key(user_id, data)
+    window = timedelta(seconds=settings.NOTIFICATION_COALESCE_SECONDS)
+
+    # The key's window is set by the latest entry the worker already took
+    # (coalesce_open is cleared on claim); identical bodies sent in it are dropped
+    latest = outbox.find_one(
+        {'coalesce_key': key, 'coalesce_open': {'$exists': False}, 'window_until': {'$gt': now}},
+        {'window_until': 1, 'bodies': 1},
+        sort=[('window_until', -1)],
+    )
+    if latest and body in latest.get('bodies', []):
+        return
+    # Inside a window: hold until it ends. Otherwise: send now.
+    due = latest['window_until'] if latest else now
+
+    update = {
+        '$setOnInsert': {
+            'user_ids':        [_oid(user_id)],
+            'title':           title,
+            'body':            body,
+            'data':            data,
+            'summary':         summary,
+            'status':          'PENDING',
+            'attempts':        0,
+            'next_attempt_at': due,
+            'window_until':    due + window,
+            'created_at':      now,
+        },
+        '$addToSet': {'bodies': body},
+    }
+    # Join the key's open (unclaimed) entry or create it; a partial unique
+    # index keeps one open entry per key
+    open_entry = {'coalesce_key': key, 'coalesce_open': True}
+    try:
+        outbox.update_one(open_entry, update, upsert=True)
+    except DuplicateKeyError:
+        # Another request created it between our find and insert
+        outbox.update_one(open_entry, update, upsert=True)
 
-def send_push_notification(user_id, title: str, body: str, data: dict = None):
+
+def enqueue_notification(user_ids, title: str, body: str, data: dict = None, summary: str = None):
     """
-    Send a push notification to a single user.
-    Silently skips if the user has no stored push token.
+    Queue one notification for delivery to `user_ids`.
+    With a `summary` (single recipient only) it is coalesced — see above.
     """
-    try:
-        users = get_users_collection()
-        user = users.find_one(
-            {'_id': ObjectId(user_id) if isinstance(user_id, str) else user_id},
-            {'expo_push_token': 1}
-        )
-        token = (user or {}).get('expo_push_token')
-        if not token:
-            return
+    data = data or {}
+    if summary and len(user_ids) == 1 and settings.NOTIFICATION_COALESCE_SECONDS > 0:
+        return _enqueue_coalesced(user_ids[0], title, body, data, summary)
+
+    now = datetime.now(timezone.utc)
+    get_notification_outbox_collection().insert_one({
+        'user_ids':        [_oid(uid) for uid in user_ids],
+        'title':           title,
+        'body':            body,
+        'data':            data,
+        'status':          'PENDING',     # → SENDING → SENT | FAILED
+        'attempts':        0,
+        'next_attempt_at': now,
+        'created_at':      now,
+    })
+
 
-        message = {
-            'to': token,
-            'sound': 'default',
-            'title': title,
-            'body': body,
-            'data': data or {},
-        }
-
-        resp = requests.post(
-            EXPO_PUSH_URL,
-            json=message,
-            headers={
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-            },
-            timeout=10,
-        )
-        print(f'[PUSH] Sent to {user_id}: {resp.status_code}')
+def send_push_notification(user_id, title: str, body: str, data: dict = None, summary: str = None):
+    """
+    Queue a push notification for a single user.
+    `summary` (e.g. '{count} people want to join your ride') makes it
+    coalescable with others of the same type for the same ride.
+    Users without a stored push token are skipped at delivery time.
+    """
+    try:
+        enqueue_notification([user_id], title, body, data, summary)
+        print(f'[PUSH] Queued for {user_id}')
     except Exception as e:
         print(f'[PUSH ERROR] {e}')
 
 
 def send_bulk_notifications(user_ids, title: str, body: str, data: dict = None):
     """
-    Send push notifications to multiple users in a single batch request.
-    Filters out users without stored push tokens.
+    Queue the same push notification for multiple users (one outbox entry).
+    Users without stored push tokens are skipped at delivery time.
     """
     try:
-        users = get_users_collection()
-        oids = [ObjectId(uid) if isinstance(uid, str) else uid for uid in user_ids]
-
-        docs = users.find(
-            {'_id': {'$in': oids}, 'expo_push_token': {'$exists': True, '$ne': ''}},
-            {'expo_push_token': 1}
-        )
-
-        messages = []
-        for doc in docs:
-            token = doc.get('expo_push_token')
-            if token:
-                messages.append({
-                    'to': token,
-                    'sound': 'default',
-                    'title': title,
-                    'body': body,
-                    'data': data or {},
-                })
-
-        if not messages:
+        user_ids = list(user_ids)
+        if not user_ids:
             return
-
-        resp = requests.post(
-            EXPO_PUSH_URL,
-            json=messages,
-            headers={
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-            },
-            timeout=15,
-        )
-        print(f'[PUSH BULK] Sent {len(messages)} notifications: {resp.status_code}')
+        enqueue_notification(user_ids, title, body, data)
+        print(f'[PUSH BULK] Queued for {len(user_ids)} users')
     except Exception as e:
         print(f'[PUSH BULK ERROR] {e}')
@@ -0,0 +1,211 @@
+"""
+Notification outbox — delivery side
+Entries queued by apps/users/notifications.py are claimed, sent to Expo via
+the pooled push transport (push.py) and marked SENT, or — for recipients
+whose chunk hit a transient failure (network errors, HTTP 429/5xx) —
+rescheduled with exponential backoff until NOTIFICATION_MAX_ATTEMPTS, then
+FAILED. Entries that cannot be built into a message, or whose earlier
+claims never finished, are FAILED too rather than re-leased forever.
+Expo's per-message tickets are kept on the entry for the receipt poller
+(receipts.py).
+
+Claiming is a single find_one_and_update per entry, so any number of workers
+can drain the same outbox. A claimed entry's next_attempt_at is pushed out
+by a lease; if the worker dies mid-send the entry becomes due again.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from pymongo import ReturnDocument
+
+from database.mongo import get_notification_outbox_collection, get_users_collection
+from .push import PushTransport, get_transport
+
+# How long a claimed entry stays invisible to other workers
+LEASE_SECONDS = 60
+
+# SENT / FAILED entries are kept this long (TTL index on expire_at)
+RETAIN_DAYS = 7
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before the next try after `attempts` failed attempts."""
+    base = settings.NOTIFICATION_RETRY_BASE_SECONDS
+    return min(base * (2 ** max(attempts - 1, 0)), settings.NOTIFICATION_RETRY_MAX_SECONDS)
+
+
+def claim_due(limit: int, now: datetime | None = None) -> list[dict]:
+    """Claim up to `limit` due entries for this worker."""
+    outbox = get_notification_outbox_collection()
+    now    = now or datetime.now(timezone.utc)
+    claimed = []
+    while len(claimed) < limit:
+        entry = outbox.find_one_and_update(
+            {'status': {'$in': ['PENDING', 'SENDING']}, 'next_attempt_at': {'$lte': now}},
+            {
+                '$set':   {'status': 'SENDING', 'next_attempt_at': now + timedelta(seconds=LEASE_SECONDS)},
+                '$inc':   {'attempts': 1},
+                '$unset': {'coalesce_open': ''},      # close the coalescing window
+            },
+            sort=[('next_attempt_at', 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if entry is None:
+            break
+        if entry['attempts'] > settings.NOTIFICATION_MAX_ATTEMPTS:
+            # Every earlier claim ended without a result (e.g. the worker
+            # crashed mid-send) — stop re-leasing it
+            _finish(entry, 'FAILED', now, [], last_error=entry.get('last_error') or 'lease expired')
+            print(f'[OUTBOX ERROR] {entry["_id"]} gave up after {entry["attempts"] - 1} unfinished attempts')
+            continue
+        claimed.append(entry)
+    return claimed
+
+
+def push_tokens(entries: list[dict]) -> dict:
+    """user_id → expo_push_token for every recipient of `entries` (one query)."""
+    oids = {uid for entry in entries for uid in entry.get('user_ids', [])}
+    if not oids:
+        return {}
+    docs = get_users_collection().find(
+        {'_id': {'$in': list(oids)}, 'expo_push_token': {'$exists': True, '$ne': ''}},
+        {'expo_push_token': 1},
+    )
+    return {doc['_id']: doc['expo_push_token'] for doc in docs if doc.get('expo_push_token')}
+
+
+def message_body(entry: dict) -> str:
+    """The entry's body, or its summary if several messages were coalesced into it."""
+    count = len(entry.get('bodies', []))
+    if count > 1 and entry.get('summary'):
+        # Not str.format: the summary embeds user text (e.g. a destination name)
+        return entry['summary'].replace('{count}', str(count))
+    return entry['body']
+
+
+def build_message(entry: dict, token: str) -> dict:
+    return {
+        'to':    token,
+        'sound': 'default',
+        'title': entry['title'],
+        'body':  message_body(entry),
+        'data':  entry.get('data') or {},
+    }
+
+
+def _ticket_record(user_id, token: str, ticket: dict) -> dict:
+    """What is kept on the entry for one delivered message (see receipts)."""
+    record = {'user_id': user_id, 'token': token}
+    if ticket.get('status') == 'ok':
+        record['id'] = ticket.get('id')
+    else:
+        record['error'] = (ticket.get('details') or {}).get('error') or ticket.get('message', 'error')
+    return record
+
+
+def _finish(entry: dict, status: str, now: datetime, tickets: list, **fields):
+    get_notification_outbox_collection().update_one(
+        {'_id': entry['_id']},
+        {
+            '$set':  {
+                'status':          status,
+                'expire_at':       now + timedelta(days=RETAIN_DAYS),
+                # picked up by the receipt poller (receipts.py)
+                'receipts_due_at': now + timedelta(seconds=settings.PUSH_RECEIPT_DELAY_SECONDS),
+                **fields,
+            },
+            '$push': {'tickets': {'$each': tickets}},
+        },
+    )
+
+
+def record_results(entry: dict, results: list[tuple], now: datetime | None = None) -> str:
+    """
+    Store the outcome of one claimed entry. `results` holds (user_id, token,
+    ticket) per message sent. Recipients whose chunk failed transiently are
+    kept on the entry and retried with backoff; everyone else is done.
+    Returns the entry's new status.
+    """
+    now     = now or datetime.now(timezone.utc)
+    retry   = [(uid, ticket) for uid, _, ticket in results if ticket.get('retryable')]
+    tickets = [_ticket_record(uid, token, ticket) for uid, token, ticket in results
+               if not ticket.get('retryable')]
+    sent    = sum(1 for t in tickets if 'id' in t)
+
+    if not retry:
+        _finish(entry, 'SENT', now, tickets, sent_at=now, sent_count=entry.get('sent_count', 0) + sent)
+        print(f'[PUSH] Sent {sent} notification(s) for {entry["_id"]}')
+        return 'SENT'
+
+    error = retry[0][1].get('message', 'error')
+    if entry['attempts'] >= settings.NOTIFICATION_MAX_ATTEMPTS:
+        _finish(entry, 'FAILED', now, tickets, last_error=error, sent_count=entry.get('sent_count', 0) + sent)
+        print(f'[OUTBOX ERROR] {entry["_id"]} gave up after {entry["attempts"]} attempts: {error}')
+        return 'FAILED'
+
+    # Only the recipients that did not get through are retried
+    delay = retry_delay(entry['attempts'])
+    get_notification_outbox_collection().update_one(
+        {'_id': entry['_id']},
+        {
+            '$set': {
+                'status':          'PENDING',
+                'user_ids':        [uid for uid, _ in retry],
+                'next_attempt_at': now + timedelta(seconds=delay),
+                'last_error':      error,
+                'sent_count':      entry.get('sent_count', 0) + sent,
+            },
+            '$push': {'tickets': {'$each': tickets}},
+        },
+    )
+    print(f'[OUTBOX] {entry["_id"]} attempt {entry["attempts"]}: {len(retry)} recipient(s) failed '
+          f'({error}); retry in {delay:.0f}s')
+    return 'PENDING'
+
+
+def dispatch_once(limit: int = 50, url: str | None = None, transport: PushTransport | None = None) -> dict:
+    """
+    Claim one batch of due entries and deliver them as a single fan-out
+    (chunked and sent concurrently by the push transport). Returns counts
+    per outcome.
+    """
+    entries = claim_due(limit)
+    counts  = {'SENT': 0, 'PENDING': 0, 'FAILED': 0}
+    if not entries:
+        return counts
+
+    now      = datetime.now(timezone.utc)
+    tokens   = push_tokens(entries)
+    plan     = []      # (entry index, user_id, token) per message
+    messages = []
+    failed   = set()   # entries that cannot be turned into a message
+    for i, entry in enumerate(entries):
+        recipients = [(uid, tokens[uid]) for uid in entry.get('user_ids', []) if uid in tokens]
+        try:
+            built = [build_message(entry, token) for _, token in recipients]
+        except Exception as e:
+            # A malformed entry must not hold up the rest of the batch
+            _finish(entry, 'FAILED', now, [], last_error=f'Bad message: {e}')
+            print(f'[OUTBOX ERROR] {entry["_id"]}: bad message: {e}')
+            counts['FAILED'] += 1
+            failed.add(i)
+            continue
+        plan.extend((i, uid, token) for uid, token in recipients)
+        messages.extend(built)
+
+    tickets = (transport or get_transport()).send(messages, url)
+
+    results = [[] for _ in entries]
+    for (i, uid, token), ticket in zip(plan, tickets):
+        results[i].append((uid, token, ticket))
+
+    now = datetime.now(timezone.utc)
+    for i, (entry, entry_results) in enumerate(zip(entries, results)):
+        if i in failed:
+            continue
+        try:
+            counts[record_results(entry, entry_results, now)] += 1
+        except Exception as e:
+            # Entry stays leased and is picked up again after LEASE_SECONDS
+            print(f'[OUTBOX ERROR] {entry["_id"]}: {e}')
+    return counts
@@ -0,0 +1,133 @@
+"""
+Expo push transport — pooled, chunked, concurrent
+One keep-alive httpx.Client per process. A fan-out is split into chunks of
+EXPO_CHUNK_SIZE messages (Expo's per-request limit) and the chunks are
+POSTed in parallel by at most PUSH_CONCURRENCY threads, which is also the
+connection pool size. send() returns one ticket per message, in order:
+
+    {'status': 'ok', 'id': '<receipt id>'}
+    {'status': 'error', 'message': ..., 'details': {'error': 'DeviceNotRegistered'}}
+    {'status': 'error', 'message': ..., 'retryable': True}   # transport/429/5xx
+
+The first two shapes are Expo's own tickets; the third is added here when a
+whole chunk could not be delivered and should be tried again later.
+get_receipts() looks up the delivery receipts for ticket ids the same way.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+
+# Expo accepts at most 100 messages per push request
+EXPO_CHUNK_SIZE = 100
+
+# ... and at most 1000 ticket ids per receipts request
+EXPO_RECEIPT_CHUNK_SIZE = 1000
+
+_HEADERS = {
+    'Accept':          'application/json',
+    'Accept-Encoding': 'gzip, deflate',
+    'Content-Type':    'application/json',
+}
+
+
+def chunked(items: list, size: int = EXPO_CHUNK_SIZE) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _failed(chunk: list, message: str, retryable: bool) -> list[dict]:
+    ticket = {'status': 'error', 'message': message}
+    if retryable:
+        ticket['retryable'] = True
+    return [dict(ticket) for _ in chunk]
+
+
+class PushTransport:
+    """Shared HTTP pool + bounded worker threads for Expo push requests."""
+
+    def __init__(self, url: str | None = None, concurrency: int | None = None, timeout: float = 15):
+        self.url         = url or settings.EXPO_PUSH_URL
+        self.concurrency = concurrency or settings.PUSH_CONCURRENCY
+        self._client     = httpx.Client(
+            headers=_HEADERS,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='push')
+
+    def _post_chunk(self, chunk: list[dict], url: str) -> list[dict]:
+        try:
+            resp = self._client.post(url, json=chunk)
+        except httpx.HTTPError as e:
+            return _failed(chunk, f'{type(e).__name__}: {e}', retryable=True)
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            return _failed(chunk, f'HTTP {resp.status_code}', retryable=True)
+        if resp.status_code != 200:
+            return _failed(chunk, f'HTTP {resp.status_code}: {resp.text[:200]}', retryable=False)
+
+        try:
+            tickets = resp.json().get('data')
+        except ValueError:
+            tickets = None
+        if not isinstance(tickets, list) or len(tickets) != len(chunk):
+            return _failed(chunk, 'Malformed push response', retryable=True)
+        return tickets
+
+    def send(self, messages: list[dict], url: str | None = None) -> list[dict]:
+        """Send `messages`; returns one ticket per message, in input order."""
+        if not messages:
+            return []
+        url    = url or self.url
+        chunks = chunked(messages)
+        if len(chunks) == 1:
+            return self._post_chunk(chunks[0], url)
+
+        tickets = []
+        for chunk_tickets in self._pool.map(lambda c: self._post_chunk(c, url), chunks):
+            tickets.extend(chunk_tickets)
+        return tickets
+
+    def _receipts_chunk(self, ids: list[str], url: str) -> dict:
+        try:
+            resp = self._client.post(url, json={'ids': ids})
+            resp.raise_for_status()
+            receipts = resp.json().get('data')
+        except (httpx.HTTPError, ValueError) as e:
+            print(f'[PUSH RECEIPTS ERROR] {len(ids)} ids: {e}')
+            return {}
+        return receipts if isinstance(receipts, dict) else {}
+
+    def get_receipts(self, ids: list[str], url: str | None = None) -> dict:
+        """
+        ticket id → receipt ({'status': 'ok'} or {'status': 'error', 'details': ...}).
+        Ids Expo has no receipt for yet, or whose request failed, are absent.
+        """
+        url    = url or settings.EXPO_RECEIPTS_URL
+        chunks = chunked(list(ids), EXPO_RECEIPT_CHUNK_SIZE)
+        receipts = {}
+        for chunk_receipts in self._pool.map(lambda c: self._receipts_chunk(c, url), chunks):
+            receipts.update(chunk_receipts)
+        return receipts
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self._client.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> PushTransport:
+    """Process-wide transport (created on first use)."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = PushTransport()
+    return _transport
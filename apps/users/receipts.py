@@ -0,0 +1,101 @@
+"""
+Push receipts — dead-token pruning
+Expo answers a push with a ticket, and only later with a receipt saying
+whether the device actually took it. Finished outbox entries become due
+for a receipt lookup PUSH_RECEIPT_DELAY_SECONDS after sending; poll_once()
+looks up their ticket ids in batches and removes `expo_push_token` from
+users whose token came back DeviceNotRegistered (app uninstalled), either
+in the receipt or already in the ticket. Later fan-outs skip those users.
+
+Receipts Expo has not produced yet are looked up again on a later poll,
+until RECEIPT_MAX_AGE after sending (Expo keeps them for about a day).
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+from apps.core.timeutil import aware_utc
+from database.mongo import get_notification_outbox_collection, get_users_collection
+from .push import PushTransport, get_transport
+
+RECEIPT_MAX_AGE = timedelta(hours=23)
+
+DEAD_TOKEN_ERROR = 'DeviceNotRegistered'
+
+
+def prune_tokens(tokens: set, now: datetime | None = None) -> int:
+    """Remove these push tokens from users. Returns users modified."""
+    if not tokens:
+        return 0
+    now = now or datetime.now(timezone.utc)
+    # Match on the token itself, so a user who has since registered a new
+    # device token keeps it
+    result = get_users_collection().update_many(
+        {'expo_push_token': {'$in': list(tokens)}},
+        {
+            '$unset': {'expo_push_token': ''},
+            '$set':   {'push_token_pruned_at': now},
+        },
+    )
+    return result.modified_count
+
+
+def poll_once(limit: int = 500, url: str | None = None, transport: PushTransport | None = None) -> dict:
+    """Check receipts for up to `limit` due outbox entries. Returns counters."""
+    outbox  = get_notification_outbox_collection()
+    now     = datetime.now(timezone.utc)
+    entries = list(outbox.find(
+        {'receipts_due_at': {'$lte': now}},
+        {'tickets': 1, 'sent_at': 1, 'created_at': 1, 'receipts_checked': 1},
+    ).sort('receipts_due_at', 1).limit(limit))
+
+    stats = {'entries': len(entries), 'receipts': 0, 'ok': 0, 'errors': 0, 'pending': 0, 'pruned': 0}
+    if not entries:
+        return stats
+
+    dead = set()
+    ids  = []
+    for entry in entries:
+        checked = set(entry.get('receipts_checked', []))
+        for ticket in entry.get('tickets', []):
+            if ticket.get('error') == DEAD_TOKEN_ERROR:
+                dead.add(ticket['token'])
+            elif ticket.get('id') and ticket['id'] not in checked:
+                ids.append(ticket['id'])
+
+    receipts = (transport or get_transport()).get_receipts(ids, url) if ids else {}
+    token_of = {t['id']: t['token'] for e in entries for t in e.get('tickets', []) if t.get('id')}
+    for ticket_id, receipt in receipts.items():
+        stats['receipts'] += 1
+        if receipt.get('status') == 'ok':
+            stats['ok'] += 1
+            continue
+        stats['errors'] += 1
+        error = (receipt.get('details') or {}).get('error')
+        if error == DEAD_TOKEN_ERROR and ticket_id in token_of:
+            dead.add(token_of[ticket_id])
+        else:
+            print(f'[PUSH RECEIPT] {ticket_id}: {error or receipt.get("message")}')
+
+    stats['pruned'] = prune_tokens(dead, now)
+
+    for entry in entries:
+        entry_ids = [t['id'] for t in entry.get('tickets', []) if t.get('id')]
+        missing   = [i for i in entry_ids if i not in receipts and i not in entry.get('receipts_checked', [])]
+        sent_at   = aware_utc(entry.get('sent_at') or entry['created_at'])
+        if missing and now - sent_at < RECEIPT_MAX_AGE:
+            # Not ready (or lookup failed) — try again later, skipping the rest
+            stats['pending'] += len(missing)
+            outbox.update_one({'_id': entry['_id']}, {
+                '$set':      {'receipts_due_at': now + timedelta(seconds=settings.PUSH_RECEIPT_DELAY_SECONDS)},
+                '$addToSet': {'receipts_checked': {'$each': [i for i in entry_ids if i in receipts]}},
+            })
+        else:
+            outbox.update_one({'_id': entry['_id']}, {
+                '$unset': {'receipts_due_at': '', 'receipts_checked': ''},
+                '$set':   {'receipts_polled_at': now},
+            })
+
+    if stats['pruned']:
+        print(f'[PUSH RECEIPTS] Pruned {stats["pruned"]} dead push token(s)')
+    return stats
@@ -6,9 +6,11 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.shortcuts import render, redirect
 from django.urls import path
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from database.mongo import get_users_collection, MongoDB
 from .services import VerificationService
+from .status_feed import status_changes
+from .auth_middleware import jwt_cache, user_status_cache
 from .auth import admin_login_required, admin_login, admin_logout
 from bson import ObjectId
 from datetime import datetime
@@ -28,6 +30,7 @@ class VerificationAdmin:
             path('<str:verification_id>/approve/', self.approve_verification, name='approve_verification'),
             path('<str:verification_id>/reject/', self.reject_verification, name='reject_verification'),
             path('otp-logs/', self.otp_logs_view, name='otp_logs'),
+            path('auth-cache-stats/', self.auth_cache_stats_view, name='auth_cache_stats'),
         ]
         return urls
     
@@ -113,6 +116,9 @@ class VerificationAdmin:
                     {'_id': verification['user_id']},
                     {'$set': {'verification_status': 'VERIFIED'}}
                 )
+                # Overrides the status claim in tokens issued before now and
+                # evicts the cached status (this worker now, others on poll)
+                status_changes.record(verification['user_id'], 'VERIFIED')
                 
                 # Success message
                 from django.contrib import messages
@@ -150,6 +156,9 @@ class VerificationAdmin:
                     {'_id': verification['user_id']},
                     {'$set': {'verification_status': 'REJECTED'}}
                 )
+                # Overrides the status claim in tokens issued before now and
+                # evicts the cached status (this worker now, others on poll)
+                status_changes.record(verification['user_id'], 'REJECTED')
                 
                 # Success message
                 from django.contrib import messages
@@ -185,6 +194,15 @@ class VerificationAdmin:
         
         return render(request, 'admin/otp_logs.html', context)
 
+    @admin_login_required
+    def auth_cache_stats_view(self, request):
+        """Per-worker auth cache counters (JSON), for sizing USER_STATUS_CACHE_* / JWT_CACHE_SIZE"""
+        return JsonResponse({
+            'user_status_cache': user_status_cache.stats(),
+            'jwt_cache':         jwt_cache.stats(),
+            'status_changes':    status_changes.stats(),
+        })
+
 
 # Create instance
 verification_admin = VerificationAdmin()
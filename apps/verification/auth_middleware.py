@@ -3,25 +3,45 @@ JWT Authentication Middleware
 Simple JWT verification for demonstration
 In production, use djangorestframework-simplejwt or similar
 """
+import hashlib
+import time
+
 import jwt
 from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
 from functools import wraps
 
+from apps.core.cache import LRUCache
+from .status_feed import JWT_LIFETIME, status_changes
+
 
 # Simple JWT secret (in production, use environment variable)
 JWT_SECRET = 'your-secret-key-change-in-production'
 JWT_ALGORITHM = 'HS256'
 
+# user_id → verification_status, for checks that go to the database
+# (VERIFICATION_STATUS_SOURCE='cache', or tokens without the claim).
+# Admin approve/reject and the status_changes feed evict entries; the TTL
+# bounds staleness for changes made anywhere else.
+user_status_cache = LRUCache(settings.USER_STATUS_CACHE_SIZE, settings.USER_STATUS_CACHE_TTL)
+status_changes.add_listener(user_status_cache.delete)
+
+# sha256(token) → decoded payload, so a token seen before skips the HMAC
+# check and JSON decode. Only successfully verified tokens are stored, and
+# a hit is still rejected once the payload's `exp` has passed.
+jwt_cache = LRUCache(settings.JWT_CACHE_SIZE)
+
 
-def generate_jwt(user_id, phone):
+def generate_jwt(user_id, phone, verification_status=None):
     """
     Generate JWT token for authenticated user
     
     Args:
         user_id: User's MongoDB ObjectId as string
         phone: User's phone number
+        verification_status: User's current status, carried as a claim so
+            verified_required can skip the user lookup (see status_feed)
         
     Returns:
         str: JWT token
@@ -31,9 +51,11 @@ def generate_jwt(user_id, phone):
     payload = {
         'user_id': str(user_id),
         'phone': phone,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7),  # 7 day expiration
+        'exp': datetime.datetime.utcnow() + JWT_LIFETIME,  # 7 day expiration
         'iat': datetime.datetime.utcnow()
     }
+    if verification_status:
+        payload['verification_status'] = verification_status
     
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
@@ -41,6 +63,7 @@ def generate_jwt(user_id, phone):
 def verify_jwt(token):
     """
     Verify JWT token and extract payload
+    Repeat tokens are served from jwt_cache until they expire.
     
     Args:
         token: JWT token string
@@ -48,14 +71,25 @@ def verify_jwt(token):
     Returns:
         dict: Decoded payload if valid, None otherwise
     """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = jwt_cache.get(digest)
+    if payload is not None:
+        if payload.get('exp', 0) > time.time():
+            return dict(payload)
+        jwt_cache.delete(digest)
+        return None
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+    if 'exp' in payload:
+        jwt_cache.set(digest, payload)
+    return dict(payload)
+
 
 def jwt_required(view_func):
     """
@@ -95,6 +129,53 @@ def jwt_required(view_func):
     return wrapper
 
 
+def check_verified_token(token):
+    """
+    Validate a JWT **and** the user's VERIFIED status.
+
+    Shared by `verified_required` and the realtime endpoints (which
+    authenticate once per connection rather than per request).
+
+    Returns:
+        (payload, None) on success,
+        (None, (error_message, http_status)) otherwise
+    """
+    payload = verify_jwt(token) if token else None
+
+    if not payload:
+        return None, ('Invalid or expired token', status.HTTP_401_UNAUTHORIZED)
+
+    # Feed poll (rate-limited): claim overrides and cache evictions
+    status_changes.refresh()
+
+    if 'verification_status' in payload and settings.VERIFICATION_STATUS_SOURCE == 'claim':
+        # --- status from the signed claim, unless it changed since issue ---
+        verification_status = (
+            status_changes.status_since(payload['user_id'], payload.get('iat', 0))
+            or payload['verification_status']
+        )
+    else:
+        # --- cached DB status (cache mode, or tokens without the claim) ---
+        verification_status = user_status_cache.get(payload['user_id'])
+        if verification_status is None:
+            from database.mongo import get_users_collection
+            from bson import ObjectId
+
+            try:
+                users = get_users_collection()
+                user = users.find_one({'_id': ObjectId(payload['user_id'])}, {'verification_status': 1})
+            except Exception:
+                return None, ('Failed to validate user', status.HTTP_500_INTERNAL_SERVER_ERROR)
+            verification_status = (user or {}).get('verification_status')
+            if verification_status:
+                user_status_cache.set(payload['user_id'], verification_status)
+
+    if verification_status != 'VERIFIED':
+        return None, ('User not verified', status.HTTP_403_FORBIDDEN)
+
+    return payload, None
+
+
 def verified_required(view_func):
     """
     Decorator to require both a valid JWT **and** VERIFIED status.
@@ -110,7 +191,7 @@ def verified_required(view_func):
     """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        # --- Step 1: validate JWT ---
+        # --- Step 1: validate JWT + verification status ---
         auth_header = request.headers.get('Authorization')
 
         if not auth_header or not auth_header.startswith('Bearer '):
@@ -120,36 +201,15 @@ def verified_required(view_func):
             )
 
         token = auth_header.split(' ')[1]
-        payload = verify_jwt(token)
+        payload, error = check_verified_token(token)
 
-        if not payload:
-            return Response(
-                {'error': 'Invalid or expired token'},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
+        if error:
+            message, code = error
+            return Response({'error': message}, status=code)
 
         request.user_id = payload['user_id']
         request.user_phone = payload['phone']
 
-        # --- Step 2: check verification status in DB ---
-        from database.mongo import get_users_collection
-        from bson import ObjectId
-
-        try:
-            users = get_users_collection()
-            user = users.find_one({'_id': ObjectId(payload['user_id'])}, {'verification_status': 1})
-        except Exception:
-            return Response(
-                {'error': 'Failed to validate user'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-
-        if not user or user.get('verification_status') != 'VERIFIED':
-            return Response(
-                {'error': 'User not verified'},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
         return view_func(request, *args, **kwargs)
 
     return wrapper
@@ -0,0 +1,68 @@
+"""
+Microbenchmark: per-request JWT auth overhead with and without jwt_cache.
+
+    python manage.py bench_jwt_cache
+    python manage.py bench_jwt_cache --requests 200000 --tokens 1000
+
+Signs --tokens distinct tokens and authenticates --requests requests that
+cycle through them (the same token arriving many times per session),
+first with the decoded-JWT cache disabled (full jwt.decode every time),
+then with it warm. Measures verify_jwt alone and a jwt_required view
+call built with RequestFactory. No database access.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from apps.core.cache import LRUCache
+from apps.verification import auth_middleware
+from apps.verification.auth_middleware import generate_jwt, jwt_required, verify_jwt
+
+
+@jwt_required
+def _view(request):
+    return request.user_id
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JWT verification per request: full decode vs the decoded-JWT cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100000, help='Authentications per run.')
+        parser.add_argument('--tokens', type=int, default=100, help='Distinct tokens cycled through.')
+
+    def handle(self, *args, **opts):
+        n      = opts['requests']
+        tokens = [generate_jwt(f'{i:024x}', f'+0000{i:07d}', 'VERIFIED') for i in range(opts['tokens'])]
+        factory  = RequestFactory()
+        requests = [factory.get('/', HTTP_AUTHORIZATION=f'Bearer {t}') for t in tokens]
+
+        def run_verify():
+            for i in range(n):
+                verify_jwt(tokens[i % len(tokens)])
+
+        def run_view():
+            for i in range(n):
+                _view(requests[i % len(requests)])
+
+        original = auth_middleware.jwt_cache
+        try:
+            results = {}
+            for label, size in (('no cache', 0), ('cached', max(len(tokens), 1))):
+                auth_middleware.jwt_cache = LRUCache(size)
+                for name, fn in (('verify_jwt', run_verify), ('jwt_required view', run_view)):
+                    fn()                                    # warm-up (fills the cache)
+                    t0 = time.perf_counter()
+                    fn()
+                    results[(name, label)] = (time.perf_counter() - t0) / n * 1e6
+                stats = auth_middleware.jwt_cache.stats()
+        finally:
+            auth_middleware.jwt_cache = original
+
+        self.stdout.write(f'{n} requests over {len(tokens)} tokens (µs per request)')
+        self.stdout.write(f'{"":<20} {"no cache":>10} {"cached":>10} {"speedup":>9}')
+        for name in ('verify_jwt', 'jwt_required view'):
+            before, after = results[(name, 'no cache')], results[(name, 'cached')]
+            self.stdout.write(f'{name:<20} {before:>10.2f} {after:>10.2f} {before / after:>8.1f}x')
+        self.stdout.write(f'cache: {stats}')
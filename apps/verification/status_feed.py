@@ -0,0 +1,107 @@
+"""
+Verification status changes — one feed per worker
+Tokens carry the user's verification_status as a signed claim, so
+verified_required needs no user lookup. What a claim cannot know is a
+change made after the token was issued; the admin panel records every
+approve/reject in the `status_changes` collection, and each worker keeps
+the latest change per user in memory.
+
+A token's claim is overridden when its user changed status after the
+token's `iat`. The feed polls for new changes at most once per
+VERIFICATION_STATUS_POLL_SECONDS (one small indexed query); changes made
+through this process apply immediately. Only the last JWT lifetime of
+changes matters, which is also how long the collection keeps them.
+Listeners (e.g. the user-status cache) hear about every change applied.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from django.conf import settings
+
+from apps.core.timeutil import WATERMARK_OVERLAP, aware_utc
+from database.mongo import get_status_changes_collection
+
+# Tokens live this long (see generate_jwt); older changes cannot affect them
+JWT_LIFETIME = timedelta(days=7)
+
+class StatusChangeFeed:
+    """user_id → (status, changed_at) for every change within JWT_LIFETIME."""
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._changes      = {}       # user_id (str) → (status, changed_at epoch seconds)
+        self._watermark    = None
+        self._last_poll    = 0.0
+        self._lock         = threading.Lock()
+        self._listeners    = []
+
+    def add_listener(self, callback):
+        """Call callback(user_id: str) for every change applied here (local or polled)."""
+        self._listeners.append(callback)
+
+    def _apply(self, user_id, status: str, at: datetime):
+        at = aware_utc(at).timestamp()
+        current = self._changes.get(str(user_id))
+        if current is None or current[1] < at:
+            self._changes[str(user_id)] = (status, at)
+            for callback in self._listeners:
+                callback(str(user_id))
+
+    def record(self, user_id, status: str):
+        """Persist a status change for every worker and apply it here at once."""
+        now = datetime.now(timezone.utc)
+        get_status_changes_collection().insert_one({
+            'user_id': ObjectId(user_id) if isinstance(user_id, str) else user_id,
+            'status':  status,
+            'at':      now,
+        })
+        with self._lock:
+            self._apply(user_id, status, now)
+
+    def refresh(self) -> int:
+        """
+        Pull changes since the last poll, at most once per poll_interval.
+        Returns the number of Mongo queries issued (0 or 1).
+        """
+        if time.monotonic() - self._last_poll < self.poll_interval:
+            return 0
+        with self._lock:
+            if time.monotonic() - self._last_poll < self.poll_interval:
+                return 0
+            polled_at = datetime.now(timezone.utc)
+            since = (self._watermark - WATERMARK_OVERLAP) if self._watermark else polled_at - JWT_LIFETIME
+            try:
+                for change in get_status_changes_collection().find(
+                    {'at': {'$gt': since}}, {'user_id': 1, 'status': 1, 'at': 1}
+                ).sort('at', 1):
+                    self._apply(change['user_id'], change['status'], change['at'])
+                self._watermark = polled_at
+            except Exception as e:
+                # Keep serving from what we have; retry after the interval
+                print(f'[STATUS_FEED ERROR] {e}')
+            self._last_poll = time.monotonic()
+            self._drop_expired(polled_at)
+            return 1
+
+    def _drop_expired(self, now: datetime):
+        cutoff = (now - JWT_LIFETIME).timestamp()
+        for user_id in [u for u, (_, at) in self._changes.items() if at < cutoff]:
+            del self._changes[user_id]
+
+    def status_since(self, user_id, issued_at: float) -> str | None:
+        """The user's status if it changed after `issued_at` (epoch seconds), else None."""
+        change = self._changes.get(str(user_id))
+        if change is not None and change[1] >= issued_at:
+            return change[0]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            'users':     len(self._changes),
+            'watermark': self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+status_changes = StatusChangeFeed(poll_interval=settings.VERIFICATION_STATUS_POLL_SECONDS)
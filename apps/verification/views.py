@@ -11,6 +11,7 @@ from django.core.files.base import ContentFile
 from django.conf import settings
 from .services import VerificationService
 from .auth_middleware import jwt_required
+from .status_feed import status_changes
 from database.mongo import get_users_collection
 from bson import ObjectId
 import os
@@ -121,6 +122,9 @@ def submit_verification(request):
             {'_id': ObjectId(user_id)},
             {'$set': {'verification_status': 'PENDING'}}
         )
+        # Like admin approve/reject: overrides the claim in earlier tokens
+        # (a resubmitting VERIFIED user loses access) and evicts the cache
+        status_changes.record(user_id, 'PENDING')
         
         print(f"[VERIFICATION] Updated user status to PENDING")
         
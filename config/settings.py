@@ -133,6 +133,44 @@ REST_FRAMEWORK = {
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'alingo_db')
 
+# Ride search cache (per worker process). Set the size to 0 to disable it.
+RIDE_SEARCH_CACHE_SIZE = int(os.getenv('RIDE_SEARCH_CACHE_SIZE', '512'))
+RIDE_SEARCH_CACHE_TTL = int(os.getenv('RIDE_SEARCH_CACHE_TTL', '60'))  # seconds; bounds staleness across workers
+# In-memory ACTIVE-ride index (per worker); when enabled and warm, search reads candidates
+# from it instead of the search cache / route_cells query
+RIDE_SEARCH_INDEX_ENABLED = os.getenv('RIDE_SEARCH_INDEX_ENABLED', 'False') == 'True'
+RIDE_SEARCH_INDEX_POLL_SECONDS = float(os.getenv('RIDE_SEARCH_INDEX_POLL_SECONDS', '2'))
+
+# Ride realtime (SSE / WebSocket): transport for ride events between workers
+RIDE_EVENTS_BACKEND = os.getenv('RIDE_EVENTS_BACKEND', 'apps.rides.events.InProcessBackend')
+
+# Push notifications: requests enqueue into `notification_outbox`, the
+# dispatch_notifications worker delivers to Expo (override the URL for a stub)
+EXPO_PUSH_URL = os.getenv('EXPO_PUSH_URL', 'https://exp.host/--/api/v2/push/send')
+EXPO_RECEIPTS_URL = os.getenv('EXPO_RECEIPTS_URL', 'https://exp.host/--/api/v2/push/getReceipts')
+# Receipts are looked up this long after sending (Expo keeps them for a day)
+PUSH_RECEIPT_DELAY_SECONDS = float(os.getenv('PUSH_RECEIPT_DELAY_SECONDS', '900'))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', '6'))
+NOTIFICATION_RETRY_BASE_SECONDS = float(os.getenv('NOTIFICATION_RETRY_BASE_SECONDS', '5'))   # doubles per attempt
+NOTIFICATION_RETRY_MAX_SECONDS = float(os.getenv('NOTIFICATION_RETRY_MAX_SECONDS', '600'))
+# The first same-type push to one user for one ride is sent at once; later ones
+# within this window are merged into a single summary push at its end (0 sends
+# each one on its own)
+NOTIFICATION_COALESCE_SECONDS = float(os.getenv('NOTIFICATION_COALESCE_SECONDS', '60'))
+# Parallel Expo requests (and pooled connections) per worker process
+PUSH_CONCURRENCY = int(os.getenv('PUSH_CONCURRENCY', '6'))
+
+# How often each worker pulls admin approve/reject changes that override
+# the verification_status claim in existing tokens
+VERIFICATION_STATUS_POLL_SECONDS = float(os.getenv('VERIFICATION_STATUS_POLL_SECONDS', '5'))
+# verified_required: 'claim' trusts the token's status claim; 'cache' looks the
+# status up through a per-worker LRU cache (size 0 disables the cache)
+VERIFICATION_STATUS_SOURCE = os.getenv('VERIFICATION_STATUS_SOURCE', 'claim')
+USER_STATUS_CACHE_SIZE = int(os.getenv('USER_STATUS_CACHE_SIZE', '10000'))
+USER_STATUS_CACHE_TTL = float(os.getenv('USER_STATUS_CACHE_TTL', '30'))   # seconds
+# Verified JWT payloads kept per worker (0 verifies the signature on every request)
+JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '10000'))
+
 # Firebase settings
 # Railway: pass the entire service account JSON as FIREBASE_CREDENTIALS_JSON env var
 # Local: use FIREBASE_CREDENTIALS_PATH pointing to the JSON file
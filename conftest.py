@@ -0,0 +1,7 @@
+"""pytest setup: configure Django so app modules import as they do under manage.py."""
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
@@ -68,6 +68,26 @@ class MongoDB:
             rides.create_index('ride_date')
         except:
             pass
+        try:
+            # Ride search: date/status/free-seat predicates pushed into the query
+            rides.create_index([('ride_date', 1), ('status', 1), ('seats_available', 1)])
+        except:
+            pass
+        try:
+            # Multikey route-cell index for route-overlap lookups
+            rides.create_index([('ride_date', 1), ('status', 1), ('route_cells', 1)])
+        except:
+            pass
+        try:
+            # Incremental refresh of the in-process ride index
+            rides.create_index('updated_at')
+        except:
+            pass
+        try:
+            # Multikey: "rides I have a participant entry in" (my-requests, my-active)
+            rides.create_index([('participants.user_id', 1), ('status', 1)])
+        except:
+            pass
 
         # ── Reviews collection indexes (Block 8) ────────────────
         reviews = cls._db.reviews
@@ -84,6 +104,45 @@ class MongoDB:
         except:
             pass
 
+        # ── Notification outbox indexes ─────────────────────────
+        outbox = cls._db.notification_outbox
+        try:
+            # Worker claim query: due entries, oldest first
+            outbox.create_index([('status', 1), ('next_attempt_at', 1)])
+        except:
+            pass
+        try:
+            # Delivered / dead entries are dropped once expire_at passes
+            outbox.create_index('expire_at', expireAfterSeconds=0)
+        except:
+            pass
+        try:
+            # One open coalescing window per recipient/type/ride
+            outbox.create_index(
+                'coalesce_key',
+                unique=True,
+                partialFilterExpression={'coalesce_open': True},
+            )
+        except:
+            pass
+        try:
+            # Coalescing: the latest window per recipient/type/ride
+            outbox.create_index([('coalesce_key', 1), ('window_until', -1)], sparse=True)
+        except:
+            pass
+        try:
+            # Receipt polling: only entries still waiting for a lookup
+            outbox.create_index('receipts_due_at', sparse=True)
+        except:
+            pass
+
+        # ── Verification status changes ─────────────────────────
+        try:
+            # Feed poll by time; kept a little longer than a JWT lives (7 days)
+            cls._db.status_changes.create_index('at', expireAfterSeconds=8 * 24 * 3600)
+        except:
+            pass
+
     @classmethod
     def get_db(cls):
         """Get the database instance"""
@@ -108,3 +167,9 @@ def get_rides_collection():
 def get_reviews_collection():
     return MongoDB.get_collection('reviews')
 
+def get_notification_outbox_collection():
+    return MongoDB.get_collection('notification_outbox')
+
+def get_status_changes_collection():
+    return MongoDB.get_collection('status_changes')
+